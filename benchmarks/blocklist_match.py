@@ -0,0 +1,161 @@
+import argparse
+import asyncio
+import os
+import random
+import string
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from browser_server import DomainBlocklist
+
+
+# Rules and request hosts are synthetic: random registrable domains, with a share
+# of the requests going to subdomains of listed ones, like trackers embedded in a page.
+# By default the list is matched by Chrome from the patterns pushed with Network.setBlockedURLs;
+# with BROWSER_BLOCKLIST_MODE=route, by DomainBlocklist.check in the route handler, which is what
+# the lookup timings measure. With --browser, a page embedding one image per host is loaded in
+# Chromium through both paths, every host resolving to a local server, so the numbers include
+# the browser's matching or the round trip to Python.
+
+TLDS = ["com", "net", "org", "io", "cn", "co.uk", "de"]
+PIXEL = b"GIF89a\x01\x00\x01\x00\x80\x00\x00\x00\x00\x00\xff\xff\xff!\xf9\x04\x01\x00\x00\x00\x00,\x00\x00\x00\x00\x01\x00\x01\x00\x00\x02\x02D\x01\x00;"
+
+
+def random_domain(rng: random.Random) -> str:
+    label = "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(4, 12)))
+    return f"{label}.{rng.choice(TLDS)}"
+
+
+def make_hosts(rng: random.Random, rules: list[str], count: int, hit_ratio: float) -> list[str]:
+    hosts = []
+    for _ in range(count):
+        if rng.random() < hit_ratio:
+            host = rng.choice(rules)
+        else:
+            host = random_domain(rng)
+        for _ in range(rng.randint(0, 3)):
+            host = f"{rng.choice(['www', 'cdn', 'static', 'api', 'img', 'px'])}.{host}"
+        hosts.append(host)
+    return hosts
+
+
+def naive_match(rules: list[str], host: str):
+    # A linear scan over suffix rules, as a Python route callback without a compiled list would do.
+    for rule in rules:
+        if host == rule or host.endswith("." + rule):
+            return rule
+    return None
+
+
+def time_per_call(func, items: list, rounds: int) -> float:
+    best = None
+    for _ in range(rounds):
+        started = time.perf_counter()
+        for item in items:
+            func(item)
+        elapsed = (time.perf_counter() - started) / len(items)
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1e9
+
+
+class Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body, content_type = (self.server.page, "text/html") if self.path == "/" else (PIXEL, "image/gif")
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+async def load_page(browser, url: str, variant: str, blocklist: DomainBlocklist) -> tuple[float, float]:
+    context = await browser.new_context()
+    page = await context.new_page()
+    push_ms = 0.0
+    if variant == "cdp":
+        started = time.perf_counter()
+        await blocklist.push(await context.new_cdp_session(page))
+        push_ms = (time.perf_counter() - started) * 1000
+    elif variant == "route":
+        async def handle(route):
+            if blocklist.check(route.request.url):
+                await route.abort("blockedbyclient")
+            else:
+                await route.fallback()
+        await context.route("**/*", handle)
+    started = time.perf_counter()
+    await page.goto(url, wait_until="load", timeout=120000)
+    load_ms = (time.perf_counter() - started) * 1000
+    await context.close()
+    return push_ms, load_ms
+
+
+async def browser_rounds(args, blocklist: DomainBlocklist, hosts: list[str]):
+    from playwright.async_api import async_playwright
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.page = "".join(f'<img src="http://{host}/{i}.gif">' for i, host in enumerate(hosts)).encode()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port = server.server_address[1]
+    try:
+        async with async_playwright() as p:
+            browser = await p.chromium.launch(args=[f"--host-resolver-rules=MAP * 127.0.0.1:{port}"])
+            results = {}
+            for variant in ("none", "cdp", "route"):
+                runs = [await load_page(browser, "http://bench.test/", variant, blocklist) for _ in range(args.rounds)]
+                results[variant] = (min(run[0] for run in runs), min(run[1] for run in runs))
+            await browser.close()
+    finally:
+        server.shutdown()
+    hits = sum(1 for host in hosts if blocklist.match(host))
+    print(f"page requests={len(hosts)} blocked={hits}")
+    for variant, (push_ms, load_ms) in results.items():
+        extra = f" push_ms={push_ms:.1f}" if variant == "cdp" else ""
+        print(f"{variant:<20} load_ms={load_ms:8.1f} {load_ms * 1000 / len(hosts):8.0f} us/request{extra}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-request cost of matching hosts against a domain blocklist")
+    parser.add_argument("--rules", type=int, default=50000)
+    parser.add_argument("--requests", type=int, default=100000)
+    parser.add_argument("--hit-ratio", type=float, default=0.3)
+    parser.add_argument("--naive-requests", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--browser", action="store_true", help="also load a page in Chromium, unfiltered, with the list in the browser and in a route handler")
+    parser.add_argument("--page-requests", type=int, default=300)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    rules = sorted({random_domain(rng) for _ in range(args.rules)})
+    started = time.perf_counter()
+    blocklist = DomainBlocklist(set(rules))
+    build_ms = (time.perf_counter() - started) * 1000
+    hosts = make_hosts(rng, rules, args.requests, args.hit_ratio)
+    urls = [f"https://{host}/path/script.js?v=1" for host in hosts]
+
+    compiled_ns = time_per_call(blocklist.match, hosts, args.rounds)
+    url_ns = time_per_call(blocklist.check, urls, args.rounds)
+    naive_ns = time_per_call(lambda host: naive_match(rules, host), hosts[: args.naive_requests], 1)
+    hits = sum(1 for host in hosts if blocklist.match(host))
+
+    print(f"rules={len(rules)} requests={len(hosts)} hit_rate={hits / len(hosts):.3f} build_ms={build_ms:.1f} mode={blocklist.mode}")
+    if blocklist.mode == "cdp":
+        print(f"the list is matched by Chrome ({len(blocklist.compact_rules())} patterns); the lookups below only attribute blocked requests")
+    print(f"{'route check':<20} {url_ns:10.0f} ns/request (host parse + match + stats)")
+    print(f"{'compiled host':<20} {compiled_ns:10.0f} ns/request")
+    print(f"{'naive scan':<20} {naive_ns:10.0f} ns/request ({args.naive_requests} requests)")
+    if args.browser:
+        asyncio.run(browser_rounds(args, blocklist, hosts[: args.page_requests]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+import argparse
+import asyncio
+import os
+import sys
+import time
+from collections import deque
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from browser_server import TicketLock
+
+
+# Each worker yields once while holding the head of the queue, standing in for
+# the awaited handler, so that every other request is parked when it finishes.
+
+
+async def drain_condition(count: int) -> float:
+    # The original log_requests queue: one deque, one Condition, notify_all on every change.
+    request_queue = deque()
+    queue_condition = asyncio.Condition()
+    gate = asyncio.Event()
+
+    async def worker(request_id: int):
+        async with queue_condition:
+            request_queue.append(request_id)
+            queue_condition.notify_all()
+        await gate.wait()
+        async with queue_condition:
+            while request_queue[0] != request_id:
+                await queue_condition.wait()
+        await asyncio.sleep(0)
+        async with queue_condition:
+            if request_queue and request_queue[0] == request_id:
+                request_queue.popleft()
+            elif request_id in request_queue:
+                request_queue.remove(request_id)
+            queue_condition.notify_all()
+
+    tasks = [asyncio.create_task(worker(i)) for i in range(count)]
+    await asyncio.sleep(0)
+    start = time.perf_counter()
+    gate.set()
+    await asyncio.gather(*tasks)
+    return time.perf_counter() - start
+
+
+async def drain_ticket(count: int) -> float:
+    lock = TicketLock()
+    gate = asyncio.Event()
+
+    async def worker(request_id: str):
+        ticket = lock.enqueue(request_id)
+        await gate.wait()
+        await lock.wait(ticket)
+        await asyncio.sleep(0)
+        lock.release(request_id)
+
+    tasks = [asyncio.create_task(worker(str(i))) for i in range(count)]
+    await asyncio.sleep(0)
+    start = time.perf_counter()
+    gate.set()
+    await asyncio.gather(*tasks)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Drain time of the request queue primitive")
+    parser.add_argument("--count", type=int, default=1000)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+    for name, func in (("condition (before)", drain_condition), ("ticket (after)", drain_ticket)):
+        timings = [asyncio.run(func(args.count)) for _ in range(args.rounds)]
+        print(f"{name:<20} count={args.count} best={min(timings) * 1000:.1f}ms avg={sum(timings) / len(timings) * 1000:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
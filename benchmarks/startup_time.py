@@ -0,0 +1,81 @@
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+# Each round starts browser_server.py as a fresh process and polls the probes,
+# so the numbers include interpreter start, imports, the bind and the browser launch.
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def probe(url: str) -> int:
+    try:
+        with urllib.request.urlopen(url, timeout=1) as response:
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+    except OSError:
+        return 0
+
+
+def wait_for(url: str, began: float, timeout: float) -> float:
+    while time.monotonic() - began < timeout:
+        if probe(url) == 200:
+            return (time.monotonic() - began) * 1000
+        time.sleep(0.01)
+    raise TimeoutError(url)
+
+
+def run_once(args) -> dict:
+    port = free_port()
+    env = dict(os.environ, BROWSER_HOST="127.0.0.1", BROWSER_PORT=str(port), BROWSER_AUTO_START=args.auto_start)
+    if args.warmup_url:
+        env["BROWSER_WARMUP_URL"] = args.warmup_url
+    base = f"http://127.0.0.1:{port}"
+    began = time.monotonic()
+    process = subprocess.Popen([sys.executable, os.path.join(ROOT, "browser_server.py")], env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        live_ms = wait_for(f"{base}/livez", began, args.timeout)
+        ready_ms = wait_for(f"{base}/readyz", began, args.timeout)
+        with urllib.request.urlopen(f"{base}/health", timeout=5) as response:
+            startup = json.loads(response.read()).get("startup") or {}
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+    return {"live_ms": live_ms, "ready_ms": ready_ms, **startup}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time from process start to /livez and /readyz")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--auto-start", default="true", help="BROWSER_AUTO_START for the server under test")
+    parser.add_argument("--warmup-url", default="")
+    parser.add_argument("--timeout", type=float, default=60)
+    args = parser.parse_args()
+
+    results = [run_once(args) for _ in range(args.rounds)]
+    names = ["live_ms", "ready_ms"] + sorted({name for result in results for name in result} - {"live_ms", "ready_ms"})
+    print(f"rounds={args.rounds} auto_start={args.auto_start} warmup_url={args.warmup_url or '-'}")
+    for name in names:
+        values = [result[name] for result in results if name in result]
+        print(f"{name:<20} best={min(values):8.1f}ms avg={sum(values) / len(values):8.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
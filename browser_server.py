@@ -1,29 +1,96 @@
 import asyncio
 import base64
+import hashlib
 import os
 import json
+import urllib.parse
 import urllib.request
 import logging
+import math
 import time
 import uuid
 import re
-from collections import deque
+import shutil
+from collections import OrderedDict, deque
 from contextlib import asynccontextmanager
-from typing import Optional
+from contextvars import ContextVar
+from email.utils import parsedate_to_datetime
+from typing import Optional, Union
 
 from fastapi import FastAPI, HTTPException, Query
 from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.routing import APIRoute
 from pydantic import BaseModel, Field
+from starlette.requests import ClientDisconnect
 from playwright.async_api import async_playwright, Page, BrowserContext, Browser
 
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
 HOST = os.getenv("BROWSER_HOST", "0.0.0.0")
 PORT = int(os.getenv("BROWSER_PORT", "3456"))
 DEFAULT_USER_DATA_DIR = os.getenv("BROWSER_USER_DATA_DIR", os.path.abspath("user_data"))
 DEFAULT_HEADLESS = os.getenv("BROWSER_HEADLESS", "true").lower() in {"1", "true", "yes", "y"}
-AUTO_START = os.getenv("BROWSER_AUTO_START", "true").lower() in {"1", "true", "yes", "y"}
+AUTO_START_MODE = os.getenv("BROWSER_AUTO_START", "true").lower()
+AUTO_START = AUTO_START_MODE in {"1", "true", "yes", "y"}
+LAZY_START = AUTO_START_MODE == "lazy"
+WARMUP_URL = os.getenv("BROWSER_WARMUP_URL", "")
 DEFAULT_CHANNEL = os.getenv("BROWSER_CHANNEL") or "chrome"
 DEFAULT_DOWNLOAD_DIR = os.getenv("BROWSER_DOWNLOAD_DIR", os.path.abspath("downloads"))
+DEFAULT_USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/144.0.7559.110 Safari/537.36"
+CDP_PORT = int(os.getenv("BROWSER_CDP_PORT", "9222"))
+BROWSER_INSTANCES = max(1, int(os.getenv("BROWSER_INSTANCES", "1")))
+PAGE_POOL_SIZE = int(os.getenv("BROWSER_PAGE_POOL_SIZE", "0"))
+AUTO_RECOVER = os.getenv("BROWSER_AUTO_RECOVER", "true").lower() in {"1", "true", "yes", "y"}
+SNAPSHOT_INTERVAL_MS = int(os.getenv("BROWSER_SNAPSHOT_INTERVAL_MS", "30000"))
+RECOVERY_ATTEMPTS = 3
+RECOVERY_SETTLE_SECONDS = 0.5
+RECOVERY_WAIT_SECONDS = 120
+BROWSER_CLOSED_MESSAGE = "Target page, context or browser has been closed"
+CDP_ENDPOINTS = os.getenv("BROWSER_CDP_ENDPOINTS", "")
+RECYCLE_NAVIGATIONS = int(os.getenv("BROWSER_RECYCLE_NAVIGATIONS", "0"))
+RECYCLE_MAX_UPTIME_MS = int(os.getenv("BROWSER_RECYCLE_MAX_UPTIME_MS", "0"))
+RECYCLE_MAX_RSS_MB = int(os.getenv("BROWSER_RECYCLE_MAX_RSS_MB", "0"))
+RECYCLE_CHECK_SECONDS = 30
+RECYCLE_DRAIN_SECONDS = 120
+HANDOFF_STATE_FILE = "handoff_state.json"
+LOCAL_STORAGE_SEED_SCRIPT = "(items) => { for (const [k, v] of Object.entries(items)) { localStorage.setItem(k, v); } }"
+PROFILE_RAMDISK = os.getenv("BROWSER_PROFILE_RAMDISK", "")
+PROFILE_SYNC_INTERVAL_MS = int(os.getenv("BROWSER_PROFILE_SYNC_INTERVAL_MS", "60000"))
+PROFILE_MAX_MB = int(os.getenv("BROWSER_PROFILE_MAX_MB", "0"))
+PROFILE_SYNC_PATHS = ("Local State", "Default/Preferences", "Default/Cookies", "Default/Cookies-journal", "Default/Network/Cookies", "Default/Network/Cookies-journal", "Default/Local Storage", "Default/IndexedDB")
+PROFILE_CACHE_PATHS = ("Default/Cache", "Default/Code Cache", "Default/GPUCache", "Default/DawnGraphiteCache", "Default/DawnWebGPUCache", "Default/Service Worker/ScriptCache", "GrShaderCache", "GraphiteDawnCache", "ShaderCache", "Crashpad")
+SETTLE_QUIET_MS = int(os.getenv("BROWSER_SETTLE_QUIET_MS", "500"))
+SETTLE_MAX_MS = int(os.getenv("BROWSER_SETTLE_MAX_MS", "10000"))
+SETTLE_SCRIPT = "() => { if (!window.__browserServerSettle) { const state = window.__browserServerSettle = { last: Date.now() }; new MutationObserver(() => { state.last = Date.now(); }).observe(document, { subtree: true, childList: true, attributes: true, characterData: true }); } return Date.now() - window.__browserServerSettle.last; }"
+BLOCKABLE_RESOURCE_TYPES = ("stylesheet", "image", "media", "font", "script", "texttrack", "xhr", "fetch", "eventsource", "websocket", "manifest", "other")
+BLOCKED_BYTES_FALLBACK = {"stylesheet": 20000, "image": 25000, "media": 500000, "font": 30000, "script": 30000}
+DEFAULT_BLOCK_RESOURCES = frozenset(value.strip() for value in os.getenv("BROWSER_BLOCK_RESOURCES", "").split(",") if value.strip()) & frozenset(BLOCKABLE_RESOURCE_TYPES)
+BLOCKLIST_FILE = os.getenv("BROWSER_BLOCKLIST_FILE", "")
+BLOCKLIST_MODE = os.getenv("BROWSER_BLOCKLIST_MODE", "cdp").lower()
+HOSTNAME_PATTERN = re.compile(r"^[a-z0-9_-]+(\.[a-z0-9_-]+)*$")
+URL_HOST_PATTERN = re.compile(r"^[a-zA-Z][a-zA-Z0-9+.-]*://(?:[^/?#@]*@)?([^/?#:\[\]]*)")
+ASSET_CACHE_DIR = os.getenv("BROWSER_ASSET_CACHE_DIR", "")
+ASSET_CACHE_MAX_MB = int(os.getenv("BROWSER_ASSET_CACHE_MAX_MB", "512"))
+ASSET_CACHE_TYPES = frozenset(value.strip() for value in os.getenv("BROWSER_ASSET_CACHE_TYPES", "script,stylesheet,font,image").split(",") if value.strip())
+ASSET_CACHE_SAVE_EVERY = 50
+ASSET_RESPONSE_DROP_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection", "keep-alive", "set-cookie", "age", "date"}
+PAGE_CACHE_TTL_MS = int(os.getenv("BROWSER_PAGE_CACHE_TTL_MS", "300000"))
+PAGE_CACHE_MAX_MB = int(os.getenv("BROWSER_PAGE_CACHE_MAX_MB", "64"))
+PAGE_CACHE_MODES = ("prefer", "bypass", "only")
+MAX_SESSIONS = int(os.getenv("BROWSER_MAX_SESSIONS", "20"))
+SESSION_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+QUEUE_MAX_DEPTH = int(os.getenv("BROWSER_QUEUE_MAX_DEPTH", "100"))
+QUEUE_MAX_WAIT_MS = int(os.getenv("BROWSER_QUEUE_MAX_WAIT_MS", "0"))
+LANE_MAX_HOLD_MS = int(os.getenv("BROWSER_LANE_MAX_HOLD_MS", "180000"))
+WATCHDOG_GRACE_SECONDS = 5
+LEASE_TIMEOUT_GRACE_MS = 30000
+QUEUE_AGING_MS = int(os.getenv("BROWSER_QUEUE_AGING_MS", "10000"))
+PRIORITY_CLASSES = ("interactive", "normal", "batch")
+TENANT_WEIGHTS = os.getenv("BROWSER_TENANT_WEIGHTS", "")
 LOG_LEVEL = os.getenv("BROWSER_LOG_LEVEL", "INFO").upper()
 LOG_FILE = os.getenv("BROWSER_LOG_FILE", os.path.abspath(os.path.join("logs", "app.log")))
 os.makedirs(os.path.dirname(LOG_FILE), exist_ok=True)
@@ -37,8 +104,19 @@ _stream_handler.setLevel(LOG_LEVEL)
 _stream_handler.setFormatter(_formatter)
 logging.basicConfig(level=LOG_LEVEL, handlers=[_file_handler, _stream_handler])
 logger = logging.getLogger("browser_server")
-request_queue = deque()
-queue_condition = asyncio.Condition()
+QUEUE_BYPASS_PATHS = {"/", "/health", "/livez", "/readyz", "/browser/recycle", "/blocklist", "/cache/assets", "/cache/assets/clear", "/cache/pages", "/cache/pages/clear", "/queue/status", "/docs/raw", "/downloads", "/downloads/last", "/debug/info", "/network/requests", "/sessions"}
+READ_ONLY_PATHS = {"/text", "/current", "/find", "/element/box", "/screenshot", "/cdp/dom/text", "/cdp/dom/html", "/cdp/dom/attributes", "/cdp/version", "/pages", "/debug/snapshot"}
+BROWSER_SCOPE_PATHS = {"/start", "/stop", "/session/new", "/session/close", "/profile/trim"}
+SESSION_SCOPE_PATHS = {"/page/switch", "/page/close", "/page/close_others", "/storage/export", "/storage/import", "/download/dir"}
+NON_CANCELLABLE_PATHS = {"/start", "/stop", "/session/new", "/session/close", "/profile/trim"}
+IDEMPOTENT_PATHS = READ_ONLY_PATHS | {"/navigate", "/wait"}
+PAGE_CACHE_PATHS = {"/navigate", "/current"}
+request_session: ContextVar[str] = ContextVar("request_session", default="default")
+request_page_target: ContextVar[Optional[str]] = ContextVar("request_page_target", default=None)
+request_current_page: ContextVar[Optional[Page]] = ContextVar("request_current_page", default=None)
+request_control: ContextVar[Optional["RequestControl"]] = ContextVar("request_control", default=None)
+request_manager: ContextVar[Optional["BrowserManager"]] = ContextVar("request_manager", default=None)
+background_tasks: set[asyncio.Task] = set()
 
 
 class StartRequest(BaseModel):
@@ -46,65 +124,81 @@ class StartRequest(BaseModel):
     user_data_dir: Optional[str] = Field(None)
     user_agent: Optional[str] = Field(None)
     channel: Optional[str] = Field(None)
+    block_resources: Optional[list[str]] = Field(None)
+    instance: Optional[int] = Field(None)
+
+
+class StopRequest(BaseModel):
+    instance: Optional[int] = Field(None)
 
 
-class NavigateRequest(BaseModel):
+class PageTargetRequest(BaseModel):
+    page_id: Optional[str] = Field(None)
+
+
+class NavigateRequest(PageTargetRequest):
     url: str = Field(...)
     wait_until: str = Field("networkidle")
     timeout: int = Field(60000)
-    extra_wait_ms: int = Field(3000)
+    extra_wait_ms: Optional[int] = Field(None)
+    settle_quiet_ms: Optional[int] = Field(None)
+    settle_max_ms: Optional[int] = Field(None)
+    block_resources: Optional[list[str]] = Field(None)
     wait_for_selector: Optional[str] = Field(None)
     wait_for_text: Optional[str] = Field(None)
+    cache: Optional[str] = Field(None)
+    include_text: bool = Field(False)
+    include_html: bool = Field(False)
 
 
-class EvaluateRequest(BaseModel):
+class EvaluateRequest(PageTargetRequest):
     script: str = Field(...)
     args: Optional[list] = Field(None)
     timeout: int = Field(30000)
 
 
-class ScreenshotRequest(BaseModel):
+class ScreenshotRequest(PageTargetRequest):
     full_page: bool = Field(True)
     selector: Optional[str] = Field(None)
     timeout: int = Field(60000)
 
 
-class WaitRequest(BaseModel):
+class WaitRequest(PageTargetRequest):
     selector: Optional[str] = Field(None)
     text: Optional[str] = Field(None)
     timeout: int = Field(30000)
 
 
-class ClickRequest(BaseModel):
+class ClickRequest(PageTargetRequest):
     selector: str = Field(...)
     timeout: int = Field(10000)
     text_contains: Optional[str] = Field(None)
     index: Optional[int] = Field(None)
 
 
-class TypeRequest(BaseModel):
+class TypeRequest(PageTargetRequest):
     selector: str = Field(...)
     text: str = Field(...)
     timeout: int = Field(10000)
     clear_first: bool = Field(True)
 
-class FillRequest(BaseModel):
+class FillRequest(PageTargetRequest):
     selector: str = Field(...)
     value: str = Field(...)
     timeout: int = Field(10000)
 
-class PressRequest(BaseModel):
+class PressRequest(PageTargetRequest):
     key: str = Field(...)
     modifiers: Optional[list[str]] = Field(None)
     timeout: int = Field(10000)
 
-class DragRequest(BaseModel):
+class DragRequest(PageTargetRequest):
     source: str = Field(...)
     target: str = Field(...)
     timeout: int = Field(10000)
 
 
-class ScrollRequest(BaseModel):
+class ScrollRequest(PageTargetRequest):
     direction: str = Field("down")
     to_bottom: bool = Field(False)
     amount: Optional[int] = Field(None)
@@ -120,27 +214,50 @@ class StorageImportRequest(BaseModel):
     url: Optional[str] = Field(None)
     timeout: int = Field(30000)
 
+class BrowserRecycleRequest(BaseModel):
+    instance: int = Field(0)
+
+
+class ProfileTrimRequest(BaseModel):
+    instance: int = Field(0)
+
+
+class SessionNewRequest(BaseModel):
+    session_id: str = Field(...)
+    storage_state: Optional[Union[dict, str]] = Field(None)
+    user_agent: Optional[str] = Field(None)
+    block_resources: Optional[list[str]] = Field(None)
+    instance: Optional[int] = Field(None)
+
+
+class SessionCloseRequest(BaseModel):
+    session_id: str = Field(...)
+
 class NewPageRequest(BaseModel):
     url: Optional[str] = Field(None)
     wait_until: str = Field("networkidle")
     timeout: int = Field(60000)
-    extra_wait_ms: int = Field(3000)
+    extra_wait_ms: Optional[int] = Field(None)
+    settle_quiet_ms: Optional[int] = Field(None)
+    settle_max_ms: Optional[int] = Field(None)
+    block_resources: Optional[list[str]] = Field(None)
     wait_for_selector: Optional[str] = Field(None)
     wait_for_text: Optional[str] = Field(None)
 
 class SwitchPageRequest(BaseModel):
-    id: int = Field(...)
+    id: Optional[int] = Field(None)
+    page_id: Optional[str] = Field(None)
 
-class CdpSendRequest(BaseModel):
+class CdpSendRequest(PageTargetRequest):
     method: str = Field(...)
     params: Optional[dict] = Field(None)
     timeout: int = Field(30000)
 
-class CdpDomRequest(BaseModel):
+class CdpDomRequest(PageTargetRequest):
     selector: str = Field(...)
     timeout: int = Field(30000)
 
-class UploadRequest(BaseModel):
+class UploadRequest(PageTargetRequest):
     selector: str = Field(...)
     paths: list[str] = Field(...)
     timeout: int = Field(30000)
@@ -148,26 +265,26 @@ class UploadRequest(BaseModel):
 class DownloadDirRequest(BaseModel):
     path: Optional[str] = Field(None)
 
-class DialogWaitRequest(BaseModel):
+class DialogWaitRequest(PageTargetRequest):
     timeout: int = Field(30000)
     action: Optional[str] = Field(None)
     prompt_text: Optional[str] = Field(None)
 
-class DialogActionRequest(BaseModel):
+class DialogActionRequest(PageTargetRequest):
     prompt_text: Optional[str] = Field(None)
 
-class ElementBoxRequest(BaseModel):
+class ElementBoxRequest(PageTargetRequest):
     selector: str = Field(...)
     timeout: int = Field(30000)
 
-class ClickPointRequest(BaseModel):
+class ClickPointRequest(PageTargetRequest):
     x: float = Field(...)
     y: float = Field(...)
     button: str = Field("left")
     clicks: int = Field(1)
     delay: int = Field(0)
 
-class DownloadWaitRequest(BaseModel):
+class DownloadWaitRequest(PageTargetRequest):
     timeout: int = Field(30000)
 
 class DownloadRequest(BaseModel):
@@ -176,41 +293,1290 @@ class DownloadRequest(BaseModel):
     timeout: int = Field(60000)
 
 
-class BrowserManager:
+class QueueTicket:
+    __slots__ = ("request_id", "shared", "future", "priority", "tenant", "endpoint", "seq", "tag", "charge", "credit", "enqueued")
+
+    def __init__(self, request_id: str, shared: bool, future: asyncio.Future, priority: int = 1, tenant: str = "-", endpoint: str = "-"):
+        self.request_id = request_id
+        self.shared = shared
+        self.future = future
+        self.priority = priority
+        self.tenant = tenant
+        self.endpoint = endpoint
+        self.seq = 0
+        self.tag = 0.0
+        self.charge = 0.0
+        self.credit = 0.0
+        self.enqueued = time.monotonic()
+
+
+class TicketLock:
+    # Reader/writer lock where each waiter owns a future. Waiters are grouped by priority class, aged up one class
+    # per aging_ms, and inside a class tenants share the lock by start-time fair queuing (smallest start tag runs).
+    # A read never passes an earlier write of its own tenant; a ticket that never ran refunds its share.
+
+    def __init__(self, aging_ms: int = QUEUE_AGING_MS):
+        self.waiters: list[dict[str, OrderedDict[str, QueueTicket]]] = [{} for _ in PRIORITY_CLASSES]
+        self.tickets: dict[str, QueueTicket] = {}
+        self.writers: dict[str, OrderedDict[str, QueueTicket]] = {}
+        self.holders: dict[str, QueueTicket] = {}
+        self.exclusive_held = False
+        self.aging_ms = aging_ms
+        self.virtual_time = 0.0
+        self.tenant_finish: dict[str, float] = {}
+        self.tenant_refunds: dict[str, dict[int, float]] = {}
+        self.sequence = 0
+
+    def __len__(self):
+        return len(self.tickets) + len(self.holders)
+
+    def enqueue(self, request_id: str, shared: bool = False, priority: int = 1, tenant: str = "-", weight: float = 1.0, cost: float = 1.0, endpoint: str = "-") -> QueueTicket:
+        ticket = QueueTicket(request_id, shared, asyncio.get_running_loop().create_future(), priority, tenant, endpoint)
+        ticket.tag = max(self.virtual_time, self.tenant_finish.get(tenant, 0.0))
+        ticket.charge = cost / max(weight, 0.01)
+        self.sequence += 1
+        ticket.seq = self.sequence
+        ticket.credit = self._refunded_before(tenant, ticket.seq)
+        self.tenant_finish[tenant] = ticket.tag + ticket.charge
+        self.waiters[priority].setdefault(tenant, OrderedDict())[request_id] = ticket
+        self.tickets[request_id] = ticket
+        if not shared:
+            self.writers.setdefault(tenant, OrderedDict())[request_id] = ticket
+        self._grant()
+        return ticket
+
+    async def wait(self, ticket: QueueTicket):
+        try:
+            await ticket.future
+        except asyncio.CancelledError:
+            self.release(ticket.request_id)
+            raise
+
+    def release(self, request_id: str, refund: bool = False):
+        ticket = self.holders.pop(request_id, None)
+        if ticket is None:
+            ticket = self.tickets.get(request_id)
+            if ticket is not None:
+                self._remove(ticket)
+                self._refund(ticket)
+        else:
+            if not ticket.shared:
+                self.exclusive_held = False
+            if refund:
+                self._refund(ticket)
+        self._grant()
+
+    def start_tag(self, ticket: QueueTicket) -> float:
+        # Refunds of the tenant's earlier tickets made after this one was enqueued move it up.
+        return ticket.tag - (self._refunded_before(ticket.tenant, ticket.seq) - ticket.credit)
+
+    def _refunded_before(self, tenant: str, seq: int) -> float:
+        # Refunds are summed in a Fenwick tree keyed by ticket sequence, so a lookup or a refund takes at most 40 steps.
+        tree = self.tenant_refunds.get(tenant)
+        total = 0.0
+        while tree and seq > 0:
+            total += tree.get(seq, 0.0)
+            seq -= seq & -seq
+        return total
+
+    def _refund(self, ticket: QueueTicket):
+        # A ticket that never ran gives its share back; only the tenant's tickets enqueued after it move up.
+        tree = self.tenant_refunds.setdefault(ticket.tenant, {})
+        seq = ticket.seq + 1
+        while seq < 1 << 40:
+            tree[seq] = tree.get(seq, 0.0) + ticket.charge
+            seq += seq & -seq
+        finish = self.tenant_finish.get(ticket.tenant)
+        if finish is not None:
+            self.tenant_finish[ticket.tenant] = finish - ticket.charge
+
+    def priority_depth(self) -> dict[str, int]:
+        return {name: sum(len(queue) for queue in self.waiters[rank].values()) for rank, name in enumerate(PRIORITY_CLASSES)}
+
+    def tenant_depth(self) -> dict[str, dict]:
+        tenants: dict[str, dict] = {}
+        for ticket in self.tickets.values():
+            tenants.setdefault(ticket.tenant, {"waiting": 0, "running": 0})["waiting"] += 1
+        for ticket in self.holders.values():
+            tenants.setdefault(ticket.tenant, {"waiting": 0, "running": 0})["running"] += 1
+        return tenants
+
+    def _remove(self, ticket: QueueTicket):
+        del self.tickets[ticket.request_id]
+        queues = self.waiters[ticket.priority]
+        queue = queues[ticket.tenant]
+        del queue[ticket.request_id]
+        if not queue:
+            del queues[ticket.tenant]
+            if not any(ticket.tenant in queues for queues in self.waiters):
+                self.tenant_refunds.pop(ticket.tenant, None)
+        if not ticket.shared:
+            writers = self.writers[ticket.tenant]
+            del writers[ticket.request_id]
+            if not writers:
+                del self.writers[ticket.tenant]
+
+    def _next(self) -> QueueTicket:
+        now = time.monotonic()
+        best = None
+        best_rank = 0.0
+        for queues in self.waiters:
+            head = None
+            head_tag = 0.0
+            for queue in queues.values():
+                ticket = next(iter(queue.values()))
+                tag = self.start_tag(ticket)
+                if head is None or (tag, ticket.enqueued) < (head_tag, head.enqueued):
+                    head = ticket
+                    head_tag = tag
+            if head is None:
+                continue
+            rank = float(head.priority)
+            if self.aging_ms > 0:
+                rank -= (now - head.enqueued) * 1000 / self.aging_ms
+            if best is None or rank < best_rank or (rank == best_rank and head.enqueued < best.enqueued):
+                best = head
+                best_rank = rank
+        if best is not None and best.shared:
+            # A read must not see the state from before a write its client sent earlier.
+            writers = self.writers.get(best.tenant)
+            writer = next(iter(writers.values())) if writers else None
+            if writer is not None and writer.enqueued < best.enqueued:
+                best = writer
+        return best
+
+    def _grant(self):
+        while self.tickets:
+            ticket = self._next()
+            if not ticket.future.done():
+                if self.exclusive_held or (not ticket.shared and self.holders):
+                    return
+                self.holders[ticket.request_id] = ticket
+                if not ticket.shared:
+                    self.exclusive_held = True
+                self.virtual_time = max(self.virtual_time, self.start_tag(ticket))
+                ticket.future.set_result(True)
+            self._remove(ticket)
+        if len(self.tenant_finish) > 256:
+            self.tenant_finish = {tenant: finish for tenant, finish in self.tenant_finish.items() if finish > self.virtual_time}
+
+
+class RequestControl:
+    __slots__ = ("task", "reason")
+
     def __init__(self):
+        self.task: Optional[asyncio.Task] = None
+        self.reason: Optional[str] = None
+
+    def cancel(self, reason: str) -> bool:
+        self.reason = reason
+        if self.task and not self.task.done():
+            self.task.cancel()
+            return True
+        return False
+
+
+class CancellableRoute(APIRoute):
+    """Runs each endpoint in its own task so the middleware can abort it."""
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+
+        async def run(request):
+            try:
+                return await attempt(request)
+            except Exception as exc:
+                if request.url.path not in IDEMPOTENT_PATHS or not _browser_closed(exc):
+                    raise
+            logger.warning("Retrying %s after browser recovery", request.url.path)
+            await browser_pool.wait_recovered()
+            request_manager.set(None)
+            return await attempt(request)
+
+        async def attempt(request):
+            control = request_control.get()
+            if control is None:
+                return await handler(request)
+            task = asyncio.ensure_future(handler(request))
+            control.task = task
+            try:
+                return await task
+            except asyncio.CancelledError:
+                if control.reason is None:
+                    raise
+                if control.reason == "deadline":
+                    raise HTTPException(408, "Deadline exceeded, request cancelled")
+                if control.reason == "watchdog":
+                    raise HTTPException(504, "Request exceeded lane lease, request cancelled")
+                raise HTTPException(499, "Client disconnected, request cancelled")
+
+        return run
+
+
+def _browser_closed(exc: Exception) -> bool:
+    if isinstance(exc, HTTPException):
+        return exc.status_code == 503 or BROWSER_CLOSED_MESSAGE in str(exc.detail)
+    return BROWSER_CLOSED_MESSAGE in str(exc)
+
+
+def _spawn(coro) -> asyncio.Task:
+    # The event loop keeps only weak references to tasks, so fire-and-forget work is held here until it finishes.
+    task = asyncio.create_task(coro)
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+    return task
+
+
+def _parse_weights(value: str) -> dict[str, float]:
+    weights = {}
+    for item in value.split(","):
+        name, sep, weight = item.strip().rpartition("=")
+        if not sep or not name:
+            continue
+        try:
+            weights[name] = float(weight)
+        except ValueError:
+            logger.warning("Ignoring tenant weight %s", item)
+    return weights
+
+
+class ServiceTimeModel:
+    """Rolling per-endpoint service time estimates (exponentially weighted)."""
+
+    def __init__(self, alpha: float = 0.2, default_ms: float = 1000.0, max_endpoints: int = 256):
+        self.alpha = alpha
+        self.overall = default_ms
+        self.samples = 0
+        self.max_endpoints = max_endpoints
+        self.endpoints: dict[str, dict] = {}
+
+    def observe(self, endpoint: str, elapsed_ms: float):
+        self.overall = elapsed_ms if not self.samples else self.overall + self.alpha * (elapsed_ms - self.overall)
+        self.samples += 1
+        stats = self.endpoints.get(endpoint)
+        if stats is None:
+            if len(self.endpoints) >= self.max_endpoints:
+                return
+            self.endpoints[endpoint] = {"estimated_ms": elapsed_ms, "samples": 1}
+            return
+        stats["estimated_ms"] += self.alpha * (elapsed_ms - stats["estimated_ms"])
+        stats["samples"] += 1
+
+    def estimate(self, endpoint: str) -> float:
+        stats = self.endpoints.get(endpoint)
+        return stats["estimated_ms"] if stats else self.overall
+
+
+class RequestScheduler:
+    def __init__(self, max_depth: int = QUEUE_MAX_DEPTH, max_wait_ms: int = QUEUE_MAX_WAIT_MS, aging_ms: int = QUEUE_AGING_MS, tenant_weights: Optional[dict[str, float]] = None):
+        self.aging_ms = aging_ms
+        self.tenant_weights = _parse_weights(TENANT_WEIGHTS) if tenant_weights is None else tenant_weights
+        self.gate = TicketLock(aging_ms)
+        self.sessions: dict[str, TicketLock] = {}
+        self.lanes: dict[str, TicketLock] = {}
+        self.lane_sessions: dict[str, str] = {}
+        self.request_sessions: dict[str, str] = {}
+        self.request_lanes: dict[str, str] = {}
+        self.pending: dict[str, tuple[str, str]] = {}
+        self.held_sessions: dict[str, list[str]] = {}
+        self.max_depth = max_depth
+        self.max_wait_ms = max_wait_ms
+        self.service_model = ServiceTimeModel()
+        self.started: dict[str, float] = {}
+        self.rejected = 0
+        self.abandoned = {"disconnected": 0, "deadline": 0}
+        self.cancelled = {"disconnected": 0, "deadline": 0, "watchdog": 0}
+
+    def _remaining_ms(self, ticket: QueueTicket, now: float) -> float:
+        estimate = self.service_model.estimate(ticket.endpoint)
+        started = self.started.get(ticket.request_id)
+        if started is None:
+            return estimate
+        return max(estimate - (now - started) * 1000, 0.0)
+
+    def _waiting_order(self, lock: TicketLock) -> list[QueueTicket]:
+        return sorted(lock.tickets.values(), key=lambda ticket: (ticket.priority, lock.start_tag(ticket), ticket.enqueued))
+
+    def _lane_wait_ms(self, lock: Optional[TicketLock], now: float) -> float:
+        if lock is None:
+            return 0.0
+        running = max((self._remaining_ms(ticket, now) for ticket in lock.holders.values()), default=0.0)
+        return running + sum(self.service_model.estimate(ticket.endpoint) for ticket in lock.tickets.values())
+
+    def estimate_wait_ms(self, lane_key: str, session_id: str = "default") -> int:
+        now = time.monotonic()
+        exclusive_waiting = sum(self.service_model.estimate(ticket.endpoint) for ticket in self.gate.tickets.values() if not ticket.shared)
+        if lane_key == "browser":
+            lanes = max((self._lane_wait_ms(lane, now) for lane in self.lanes.values()), default=0.0)
+            held = sum(self._remaining_ms(ticket, now) for ticket in self.gate.holders.values() if not ticket.shared)
+            return int(lanes + held + exclusive_waiting)
+        session = self.sessions.get(session_id)
+        if session is not None:
+            exclusive_waiting += sum(self.service_model.estimate(ticket.endpoint) for ticket in session.tickets.values() if not ticket.shared)
+            exclusive_waiting += sum(self._remaining_ms(ticket, now) for ticket in session.holders.values() if not ticket.shared)
+        if lane_key == f"session:{session_id}":
+            lanes = max((self._lane_wait_ms(lane, now) for key, lane in self.lanes.items() if self.lane_sessions.get(key) == session_id), default=0.0)
+            return int(lanes + exclusive_waiting)
+        return int(self._lane_wait_ms(self.lanes.get(lane_key), now) + exclusive_waiting)
+
+    def depth(self, lane_key: str, session_id: str = "default") -> int:
+        # Requests still waiting at the gate or the session count towards the lane they are headed for.
+        if lane_key == "browser":
+            return len(self.gate)
+        if lane_key == f"session:{session_id}":
+            lane = self.sessions.get(session_id)
+            ahead = sum(1 for request_id, (sid, _) in self.pending.items() if sid == session_id and request_id not in self.request_sessions)
+        else:
+            lane = self.lanes.get(lane_key)
+            ahead = sum(1 for _, hint in self.pending.values() if hint == lane_key)
+        return (len(lane) if lane is not None else 0) + ahead
+
+    def _admit(self, lane_key: str, session_id: str = "default") -> int:
+        depth = self.depth(lane_key, session_id)
+        estimated_wait_ms = self.estimate_wait_ms(lane_key, session_id)
+        if self.max_depth > 0 and depth >= self.max_depth:
+            reason = "Queue full"
+        elif self.max_wait_ms > 0 and estimated_wait_ms > self.max_wait_ms:
+            reason = "Queue wait too long"
+        else:
+            return estimated_wait_ms
+        self.rejected += 1
+        retry_after = max(1, math.ceil(estimated_wait_ms / 1000))
+        logger.warning("Queue rejected lane=%s depth=%s estimated_wait_ms=%s", lane_key, depth, estimated_wait_ms)
+        raise HTTPException(429, f"{reason}: lane={lane_key} depth={depth} estimated_wait_ms={estimated_wait_ms}", headers={"Retry-After": str(retry_after), "X-Queue-Estimated-Wait-Ms": str(estimated_wait_ms)})
+
+    def tenant_weight(self, identity: str, tenant: str) -> float:
+        for key in (identity, tenant):
+            weight = self.tenant_weights.get(key)
+            if weight is not None:
+                return weight
+        return 1.0
+
+    async def acquire(self, request_id: str, scope: str, resolve_lane, session_id: str = "default", read_only: bool = False, priority: int = 1, tenant: str = "-", weight: float = 1.0, endpoint: str = "-", admit: bool = True) -> tuple[str, int, int]:
+        if scope == "browser":
+            lane_hint = "browser"
+        elif scope == "session":
+            lane_hint = f"session:{session_id}"
+        else:
+            lane_hint = resolve_lane()
+        estimated_wait_ms = self._admit(lane_hint, session_id) if admit else self.estimate_wait_ms(lane_hint, session_id)
+        cost = self.service_model.estimate(endpoint) / 1000
+        if scope != "browser":
+            self.pending[request_id] = (session_id, lane_hint)
+        ticket = self.gate.enqueue(request_id, shared=scope != "browser", priority=priority, tenant=tenant, weight=weight, cost=cost, endpoint=endpoint)
+        position = len(self.gate)
+        await self.gate.wait(ticket)
+        if scope == "browser":
+            self.started[request_id] = time.monotonic()
+            return "browser", position, estimated_wait_ms
+        session = self.sessions.get(session_id)
+        if session is None:
+            session = self.sessions[session_id] = TicketLock(self.aging_ms)
+        self.request_sessions[request_id] = session_id
+        ticket = session.enqueue(request_id, shared=scope != "session", priority=priority, tenant=tenant, weight=weight, cost=cost, endpoint=endpoint)
+        if scope == "session":
+            self.pending.pop(request_id, None)
+        position = len(session)
+        await session.wait(ticket)
+        if scope == "session":
+            self.started[request_id] = time.monotonic()
+            return lane_hint, position, estimated_wait_ms
+        lane_key = resolve_lane()
+        lane = self.lanes.get(lane_key)
+        if lane is None:
+            lane = self.lanes[lane_key] = TicketLock(self.aging_ms)
+            self.lane_sessions[lane_key] = session_id
+        self.request_lanes[request_id] = lane_key
+        ticket = lane.enqueue(request_id, shared=read_only, priority=priority, tenant=tenant, weight=weight, cost=cost, endpoint=endpoint)
+        self.pending.pop(request_id, None)
+        position = len(lane)
+        await lane.wait(ticket)
+        self.started[request_id] = time.monotonic()
+        return lane_key, position, estimated_wait_ms
+
+    async def acquire_sessions(self, request_id: str, resolve_sessions, priority: int = 0, tenant: str = "-", endpoint: str = "-"):
+        # A shared gate ticket keeps browser-wide requests such as /session/new out, so the sessions
+        # resolved once it is granted stay complete; each of them is then held exclusively.
+        ticket = self.gate.enqueue(request_id, shared=True, priority=priority, tenant=tenant, endpoint=endpoint)
+        await self.gate.wait(ticket)
+        held = self.held_sessions[request_id] = []
+        for session_id in resolve_sessions():
+            session = self.sessions.get(session_id)
+            if session is None:
+                session = self.sessions[session_id] = TicketLock(self.aging_ms)
+            held.append(session_id)
+            ticket = session.enqueue(request_id, priority=priority, tenant=tenant, endpoint=endpoint)
+            await session.wait(ticket)
+
+    def release_sessions(self, request_id: str):
+        for session_id in self.held_sessions.pop(request_id, []):
+            session = self.sessions.get(session_id)
+            if session is not None:
+                session.release(request_id)
+                if not len(session):
+                    self.sessions.pop(session_id, None)
+        self.gate.release(request_id)
+
+    def release(self, request_id: str, refund: bool = False):
+        self.pending.pop(request_id, None)
+        started = self.started.pop(request_id, None)
+        session_id = self.request_sessions.pop(request_id, None)
+        session = self.sessions.get(session_id) if session_id else None
+        lane_key = self.request_lanes.pop(request_id, None)
+        lane = self.lanes.get(lane_key) if lane_key else None
+        ticket = (lane.holders.get(request_id) if lane is not None else None) or (session.holders.get(request_id) if session is not None else None) or self.gate.holders.get(request_id)
+        if started is not None and ticket is not None:
+            self.service_model.observe(ticket.endpoint, (time.monotonic() - started) * 1000)
+        if lane is not None:
+            lane.release(request_id, refund)
+            if not len(lane):
+                self.lanes.pop(lane_key, None)
+                self.lane_sessions.pop(lane_key, None)
+        if session is not None:
+            session.release(request_id, refund)
+            if not len(session):
+                self.sessions.pop(session_id, None)
+        self.gate.release(request_id, refund)
+
+    def _entry(self, ticket: QueueTicket, lane_key: str, state: str, now: float) -> dict:
+        return {
+            "request_id": ticket.request_id,
+            "endpoint": ticket.endpoint,
+            "lane": lane_key,
+            "tenant": ticket.tenant,
+            "priority": PRIORITY_CLASSES[ticket.priority],
+            "state": state,
+            "age_ms": int((now - ticket.enqueued) * 1000),
+        }
+
+    def status(self) -> dict:
+        now = time.monotonic()
+        gate = self.gate
+        current = next(iter(gate.holders), None) or next(iter(gate.tickets), None)
+        total = len(gate)
+        running = 0
+        lanes = []
+        entries = []
+        priorities = gate.priority_depth()
+        tenants: dict[str, dict] = {}
+        for ticket in gate.holders.values():
+            if not ticket.shared:
+                tenants.setdefault(ticket.tenant, {"waiting": 0, "running": 0})["running"] += 1
+                entries.append(self._entry(ticket, "browser", "running", now))
+        for ticket in self._waiting_order(gate):
+            tenants.setdefault(ticket.tenant, {"waiting": 0, "running": 0})["waiting"] += 1
+            entry = self._entry(ticket, "browser" if not ticket.shared else "gate", "waiting", now)
+            entry["estimated_wait_ms"] = self.estimate_wait_ms("browser")
+            entries.append(entry)
+        sessions = []
+        for session_id, session in self.sessions.items():
+            key = f"session:{session_id}"
+            for ticket in session.holders.values():
+                if not ticket.shared:
+                    tenants.setdefault(ticket.tenant, {"waiting": 0, "running": 0})["running"] += 1
+                    entries.append(self._entry(ticket, key, "running", now))
+            for ticket in self._waiting_order(session):
+                tenants.setdefault(ticket.tenant, {"waiting": 0, "running": 0})["waiting"] += 1
+                entry = self._entry(ticket, key, "waiting", now)
+                entry["estimated_wait_ms"] = self.estimate_wait_ms(key, session_id)
+                entries.append(entry)
+            session_priorities = session.priority_depth()
+            for name, depth in session_priorities.items():
+                priorities[name] += depth
+            if session.exclusive_held:
+                running += 1
+            sessions.append({
+                "session": session_id,
+                "queue_length": len(session),
+                "exclusive": session.exclusive_held,
+                "priorities": session_priorities,
+                "estimated_wait_ms": self.estimate_wait_ms(key, session_id),
+            })
+        for key, lane in self.lanes.items():
+            for tenant, counts in lane.tenant_depth().items():
+                entry = tenants.setdefault(tenant, {"waiting": 0, "running": 0})
+                entry["waiting"] += counts["waiting"]
+                entry["running"] += counts["running"]
+            ahead = 0.0
+            for ticket in lane.holders.values():
+                ahead = max(ahead, self._remaining_ms(ticket, now))
+                entries.append(self._entry(ticket, key, "running", now))
+            for ticket in self._waiting_order(lane):
+                entry = self._entry(ticket, key, "waiting", now)
+                entry["estimated_wait_ms"] = int(ahead)
+                entries.append(entry)
+                ahead += self.service_model.estimate(ticket.endpoint)
+            running += len(lane.holders)
+            readers = sum(1 for ticket in lane.holders.values() if ticket.shared)
+            lane_priorities = lane.priority_depth()
+            for name, depth in lane_priorities.items():
+                priorities[name] += depth
+            lanes.append({
+                "lane": key,
+                "session": self.lane_sessions.get(key, "default"),
+                "current_request_id": next(iter(lane.holders), None),
+                "queue_length": len(lane),
+                "running": len(lane.holders),
+                "readers": readers,
+                "priorities": lane_priorities,
+                "estimated_wait_ms": int(self._lane_wait_ms(lane, now)),
+            })
+        if gate.exclusive_held:
+            running += 1
+        endpoints = {name: {"estimated_ms": int(stats["estimated_ms"]), "samples": stats["samples"]} for name, stats in self.service_model.endpoints.items()}
+        return {
+            "current_request_id": current,
+            "queue_length": total,
+            "waiting": total - running,
+            "running": running,
+            "sessions": sessions,
+            "lanes": lanes,
+            "entries": entries,
+            "priorities": priorities,
+            "tenants": tenants,
+            "endpoints": endpoints,
+            "aging_ms": self.aging_ms,
+            "lane_max_hold_ms": LANE_MAX_HOLD_MS,
+            "max_depth": self.max_depth,
+            "max_wait_ms": self.max_wait_ms,
+            "average_service_ms": int(self.service_model.overall),
+            "rejected": self.rejected,
+            "abandoned": dict(self.abandoned),
+            "cancelled": dict(self.cancelled),
+        }
+
+
+class DomainBlocklist:
+    # Rules are kept as a flat set of hostnames; a lookup walks the host's own suffixes
+    # ("a.b.example.com", "b.example.com", ...), so its cost depends on the number of labels, not rules.
+    # Chrome compares a request with every pattern of Network.setBlockedURLs in turn, so rules already covered
+    # by a listed parent domain are left out and each remaining rule is one pattern. Matching in a route handler
+    # instead is opt-in (BROWSER_BLOCKLIST_MODE=route): it costs a round trip per request and disables the HTTP cache.
+    def __init__(self, rules: Optional[set[str]] = None):
+        self.rules: frozenset[str] = frozenset(rules or ())
+        self.compact: Optional[list[str]] = None
+        self.patterns: Optional[list[str]] = None
+        self.params: Optional[dict] = None
+        self.messages: Optional[list[str]] = None
+        self.path: Optional[str] = None
+        self.skipped = 0
+        self.load_ms = 0
+        self.checks = 0
+        self.hits = 0
+        self.rule_hits: dict[str, int] = {}
+
+    @staticmethod
+    def parse_rule(line: str) -> Optional[str]:
+        line = line.strip().lower()
+        if not line or line[0] in "#!":
+            return None
+        parts = line.split()
+        if len(parts) >= 2 and parts[0] in {"0.0.0.0", "127.0.0.1", "::", "::1"}:
+            line = parts[1]
+        elif line.startswith("||") and line.endswith("^"):
+            line = line[2:-1]
+        if line.startswith("*."):
+            line = line[2:]
+        line = line.lstrip(".").rstrip(".")
+        if not HOSTNAME_PATTERN.match(line) or line in {"localhost", "0.0.0.0"}:
+            raise ValueError(line)
+        return line
+
+    def load(self, path: str):
+        began = time.monotonic()
+        rules = set()
+        skipped = 0
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            for line in f:
+                try:
+                    rule = self.parse_rule(line)
+                except ValueError:
+                    skipped += 1
+                    continue
+                if rule:
+                    rules.add(rule)
+        self.rules = frozenset(rules)
+        self.compact = None
+        self.patterns = None
+        self.params = None
+        self.messages = None
+        self.path = path
+        self.skipped = skipped
+        self.load_ms = int((time.monotonic() - began) * 1000)
+        logger.info("Blocklist loaded path=%s rules=%d skipped=%d load_ms=%d mode=%s", path, len(self.rules), skipped, self.load_ms, self.mode)
+
+    @property
+    def mode(self) -> str:
+        if not self.rules:
+            return "off"
+        return "route" if BLOCKLIST_MODE == "route" else "cdp"
+
+    def match(self, host: Optional[str]) -> Optional[str]:
+        if not host:
+            return None
+        rules = self.rules
+        while True:
+            if host in rules:
+                return host
+            dot = host.find(".")
+            if dot < 0:
+                return None
+            host = host[dot + 1:]
+
+    def match_url(self, url: str) -> Optional[str]:
+        host = URL_HOST_PATTERN.match(url)
+        return self.match(host.group(1).lower()) if host else None
+
+    def check(self, url: str) -> Optional[str]:
+        self.checks += 1
+        rule = self.match_url(url)
+        if rule:
+            self.record(rule)
+        return rule
+
+    def seen(self):
+        self.checks += 1
+
+    def record(self, rule: str):
+        self.hits += 1
+        self.rule_hits[rule] = self.rule_hits.get(rule, 0) + 1
+
+    def compact_rules(self) -> list[str]:
+        if self.compact is None:
+            self.compact = sorted(rule for rule in self.rules if not (rule.find(".") > 0 and self.match(rule[rule.find(".") + 1:])))
+        return self.compact
+
+    def cdp_patterns(self) -> list[str]:
+        # Wildcard patterns for browsers without URLPattern support: one for the host, one for its subdomains.
+        if self.patterns is None:
+            self.patterns = [pattern for rule in self.compact_rules() for pattern in (f"*://{rule}/*", f"*://*.{rule}/*")]
+        return self.patterns
+
+    async def push(self, session):
+        await session.send("Network.enable")
+        if self.params is not None:
+            await session.send("Network.setBlockedURLs", self.params)
+            return
+        params = {"urlPatterns": [{"urlPattern": f"*://{{*.}}?{rule}/*", "block": True} for rule in self.compact_rules()]}
+        try:
+            await session.send("Network.setBlockedURLs", params)
+        except Exception:
+            params = {"urls": self.cdp_patterns()}
+            await session.send("Network.setBlockedURLs", params)
+        self.params = params
+
+    def child_messages(self) -> list[str]:
+        # Raw protocol messages for child targets, in the parameter format the browser accepted for its pages.
+        if self.messages is None:
+            self.messages = [json.dumps({"id": 1, "method": "Network.enable"}), json.dumps({"id": 2, "method": "Network.setBlockedURLs", "params": self.params})]
+        return self.messages
+
+    def status(self, top: int = 20) -> dict:
+        return {
+            "path": self.path,
+            "mode": self.mode,
+            "rules": len(self.rules),
+            "pushed_rules": len(self.compact_rules()) if self.mode == "cdp" else 0,
+            "skipped": self.skipped,
+            "load_ms": self.load_ms,
+            "checks": self.checks,
+            "hits": self.hits,
+            "hit_rate": round(self.hits / self.checks, 4) if self.checks else 0.0,
+            "top_rules": [{"rule": rule, "hits": hits} for rule, hits in sorted(self.rule_hits.items(), key=lambda item: -item[1])[:top]],
+        }
+
+
+class AssetCache:
+    # Entries are keyed by URL plus the request headers named in the response's Vary;
+    # bodies are stored once per content hash, so the same bundle served under several URLs is kept once.
+    def __init__(self, path: str, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.entries: OrderedDict[str, dict] = OrderedDict()
+        self.vary: dict[str, list[str]] = {}
+        self.blobs: dict[str, int] = {}
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.stored = 0
+        self.evicted = 0
+        self.bytes_saved = 0
+        self.unsaved = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path)
+
+    def _index_path(self) -> str:
+        return os.path.join(self.path, "index.json")
+
+    def _blob_path(self, digest: str) -> str:
+        return os.path.join(self.path, "blobs", digest[:2], digest)
+
+    def _key(self, url: str, names: list[str], headers: dict) -> str:
+        parts = [url] + [f"{name}={headers.get(name, '')}" for name in names]
+        return hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()
+
+    def load(self):
+        os.makedirs(os.path.join(self.path, "blobs"), exist_ok=True)
+        try:
+            with open(self._index_path(), "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            data = {}
+        now = time.time()
+        for key, entry in data.get("entries", []):
+            if entry["expires_at"] <= now or not os.path.exists(self._blob_path(entry["digest"])):
+                continue
+            self.entries[key] = entry
+            if entry["digest"] not in self.blobs:
+                self.size += entry["size"]
+            self.blobs[entry["digest"]] = self.blobs.get(entry["digest"], 0) + 1
+        self.vary = {url: names for url, names in data.get("vary", {}).items()}
+        for root, _, files in os.walk(os.path.join(self.path, "blobs")):
+            for name in files:
+                if name not in self.blobs:
+                    try:
+                        os.remove(os.path.join(root, name))
+                    except OSError:
+                        pass
+        self._evict()
+        logger.info("Asset cache loaded path=%s entries=%d size_mb=%.1f", self.path, len(self.entries), self.size / (1024 * 1024))
+
+    def _index_data(self) -> dict:
+        urls = {entry["url"] for entry in self.entries.values()}
+        return {"entries": list(self.entries.items()), "vary": {url: names for url, names in self.vary.items() if url in urls}}
+
+    def _write_index(self, data: dict):
+        _write_file(self._index_path(), json.dumps(data).encode("utf-8"))
+
+    def save(self):
+        if self.enabled:
+            self._write_index(self._index_data())
+            self.unsaved = 0
+
+    @staticmethod
+    def freshness(headers: dict, request_headers: dict) -> Optional[float]:
+        # Only responses that say how long they stay fresh are kept; nothing is revalidated.
+        if "set-cookie" in headers or headers.get("vary", "").strip() == "*":
+            return None
+        directives = {}
+        for part in headers.get("cache-control", "").lower().split(","):
+            name, _, value = part.strip().partition("=")
+            directives[name] = value.strip('"')
+        if {"no-store", "no-cache", "private"} & directives.keys():
+            return None
+        # The cache is shared by all sessions: responses to requests that carried credentials, a login or
+        # any other cookie, only if explicitly shareable (RFC 9111 3.5).
+        if ("authorization" in request_headers or "cookie" in request_headers) and not {"public", "s-maxage"} & directives.keys():
+            return None
+        if directives.get("max-age", "").isdigit():
+            max_age = int(directives["max-age"])
+            return time.time() + max_age if max_age > 0 else None
+        expires = headers.get("expires")
+        if expires:
+            try:
+                expires_at = parsedate_to_datetime(expires).timestamp()
+            except (TypeError, ValueError):
+                return None
+            return expires_at if expires_at > time.time() else None
+        return None
+
+    async def get(self, url: str, request_headers: dict) -> Optional[tuple[dict, bytes]]:
+        names = self.vary.get(url)
+        key = self._key(url, names, request_headers) if names is not None else None
+        entry = self.entries.get(key) if key else None
+        if entry is None or entry["expires_at"] <= time.time():
+            self.misses += 1
+            return None
+        try:
+            body = await asyncio.to_thread(_read_file, self._blob_path(entry["digest"]))
+        except OSError:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        self.bytes_saved += len(body)
+        return entry, body
+
+    async def put(self, url: str, request_headers: dict, status: int, headers: dict, body: bytes):
+        if status != 200 or not body or len(body) > self.max_bytes // 10:
+            return
+        expires_at = self.freshness(headers, request_headers)
+        if expires_at is None:
+            return
+        names = sorted(name.strip().lower() for name in headers.get("vary", "").split(",") if name.strip())
+        digest = hashlib.sha256(body).hexdigest()
+        if digest not in self.blobs:
+            await asyncio.to_thread(_write_file, self._blob_path(digest), body)
+        key = self._key(url, names, request_headers)
+        old = self.entries.pop(key, None)
+        if old:
+            self._release(old["digest"], old["size"])
+        if digest not in self.blobs:
+            self.size += len(body)
+        self.blobs[digest] = self.blobs.get(digest, 0) + 1
+        stored_headers = {name: value for name, value in headers.items() if name not in ASSET_RESPONSE_DROP_HEADERS}
+        self.entries[key] = {"url": url, "digest": digest, "size": len(body), "headers": stored_headers, "expires_at": expires_at}
+        self.vary[url] = names
+        self.stored += 1
+        self._evict()
+        self.unsaved += 1
+        if self.unsaved >= ASSET_CACHE_SAVE_EVERY:
+            self.unsaved = 0
+            await asyncio.to_thread(self._write_index, self._index_data())
+
+    def _release(self, digest: str, size: int):
+        self.blobs[digest] -= 1
+        if self.blobs[digest] <= 0:
+            del self.blobs[digest]
+            self.size -= size
+            try:
+                os.remove(self._blob_path(digest))
+            except OSError:
+                pass
+
+    def _evict(self):
+        while self.size > self.max_bytes and self.entries:
+            _, entry = self.entries.popitem(last=False)
+            self._release(entry["digest"], entry["size"])
+            self.evicted += 1
+
+    async def clear(self):
+        self.entries.clear()
+        self.vary.clear()
+        self.blobs.clear()
+        self.size = 0
+        await asyncio.to_thread(shutil.rmtree, os.path.join(self.path, "blobs"), True)
+        os.makedirs(os.path.join(self.path, "blobs"), exist_ok=True)
+        self.save()
+
+    def status(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "path": self.path or None,
+            "resource_types": sorted(ASSET_CACHE_TYPES),
+            "entries": len(self.entries),
+            "blobs": len(self.blobs),
+            "size_mb": round(self.size / (1024 * 1024), 1),
+            "max_mb": round(self.max_bytes / (1024 * 1024)),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "stored": self.stored,
+            "evicted": self.evicted,
+            "bytes_saved": self.bytes_saved,
+        }
+
+
+def _read_file(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def _write_file(path: str, data: bytes):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+class PageCache:
+    # Extracted page content per (session, URL, blocked resource types, wait conditions), evicted by age and total size.
+    def __init__(self, ttl_ms: int, max_bytes: int):
+        self.ttl = ttl_ms / 1000
+        self.max_bytes = max_bytes
+        self.entries: OrderedDict[tuple, dict] = OrderedDict()
+        self.latest: dict[tuple[str, str], tuple] = {}
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.stored = 0
+        self.evicted = 0
+
+    @staticmethod
+    def key(session_id: str, url: str, block_resources=None, wait: tuple = ()) -> tuple:
+        return session_id, url, tuple(sorted(block_resources or ())), wait
+
+    def get(self, session_id: str, url: str, block_resources=None, wait: tuple = (), any_options: bool = False) -> Optional[dict]:
+        key = self.latest.get((session_id, url)) if any_options else self.key(session_id, url, block_resources, wait)
+        entry = self.entries.get(key) if key else None
+        if entry is not None and time.monotonic() - entry["stored_at"] > self.ttl:
+            self._drop(key)
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, session_id: str, url: str, block_resources, wait: tuple, final_url: str, title: str, text: str, html: str):
+        key = self.key(session_id, url, block_resources, wait)
+        if key in self.entries:
+            self._drop(key)
+        entry = {"url": final_url, "title": title, "text": text, "html": html, "stored_at": time.monotonic(), "size": len(text) + len(html)}
+        if entry["size"] > self.max_bytes:
+            return
+        self.entries[key] = entry
+        self.latest[(session_id, url)] = key
+        self.size += entry["size"]
+        self.stored += 1
+        while self.size > self.max_bytes:
+            self._drop(next(iter(self.entries)))
+            self.evicted += 1
+
+    def _drop(self, key: tuple):
+        entry = self.entries.pop(key)
+        self.size -= entry["size"]
+        if self.latest.get(key[:2]) == key:
+            del self.latest[key[:2]]
+
+    def result(self, entry: dict, include_text: bool, include_html: bool) -> dict:
+        result = {"success": True, "url": entry["url"], "title": entry["title"], "cached": True, "age_ms": int((time.monotonic() - entry["stored_at"]) * 1000)}
+        if include_html:
+            result["html"] = entry["html"]
+            result["html_length"] = len(entry["html"])
+        if include_text:
+            result["text"] = entry["text"]
+            result["text_length"] = len(entry["text"])
+        return result
+
+    def clear(self):
+        self.entries.clear()
+        self.latest.clear()
+        self.size = 0
+
+    def status(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "ttl_ms": int(self.ttl * 1000),
+            "entries": len(self.entries),
+            "size_mb": round(self.size / (1024 * 1024), 1),
+            "max_mb": round(self.max_bytes / (1024 * 1024)),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "stored": self.stored,
+            "evicted": self.evicted,
+        }
+
+
+def _cache_mode(value: Optional[str]) -> Optional[str]:
+    if value is not None and value not in PAGE_CACHE_MODES:
+        raise HTTPException(400, f"Invalid cache: {value}, expected one of {', '.join(PAGE_CACHE_MODES)}")
+    return value
+
+
+BLOCKLIST = DomainBlocklist()
+if BLOCKLIST_FILE:
+    try:
+        BLOCKLIST.load(BLOCKLIST_FILE)
+    except OSError as e:
+        logger.error("Blocklist load failed path=%s error=%s", BLOCKLIST_FILE, e)
+ASSET_CACHE = AssetCache(os.path.abspath(ASSET_CACHE_DIR) if ASSET_CACHE_DIR else "", ASSET_CACHE_MAX_MB * 1024 * 1024)
+if ASSET_CACHE.enabled:
+    ASSET_CACHE.load()
+PAGE_CACHE = PageCache(PAGE_CACHE_TTL_MS, PAGE_CACHE_MAX_MB * 1024 * 1024)
+
+
+def _instance_path(path: str, instance: int) -> str:
+    return path if instance == 0 else f"{path.rstrip(os.sep)}-{instance}"
+
+
+def _cdp_endpoint(value: str) -> str:
+    value = value.strip()
+    if value.isdigit():
+        return f"http://127.0.0.1:{value}"
+    return value if "://" in value else f"http://{value}"
+
+
+def _slot_path(path: str, slot: int) -> str:
+    return path if slot == 0 else f"{path.rstrip(os.sep)}-recycle{slot}"
+
+
+def _block_resources(values: Optional[list[str]]) -> Optional[frozenset[str]]:
+    if values is None:
+        return None
+    types = frozenset(value.strip().lower() for value in values if value.strip())
+    invalid = types - frozenset(BLOCKABLE_RESOURCE_TYPES)
+    if invalid:
+        raise HTTPException(400, f"Invalid block_resources: {', '.join(sorted(invalid))}, expected any of {', '.join(BLOCKABLE_RESOURCE_TYPES)}")
+    return types
+
+
+def _ram_profile_path(path: str) -> str:
+    digest = hashlib.sha1(path.encode("utf-8")).hexdigest()[:8]
+    return os.path.join(os.path.abspath(PROFILE_RAMDISK), f"{os.path.basename(path.rstrip(os.sep))}-{digest}")
+
+
+def _dir_size_mb(path: str) -> float:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                pass
+    return total / (1024 * 1024)
+
+
+def _copy_profile(src: str, dst: str):
+    def ignore(directory: str, names: list[str]) -> list[str]:
+        rel = os.path.relpath(directory, src)
+        return [name for name in names if name.startswith("Singleton") or os.path.normpath(os.path.join(rel, name)).replace(os.sep, "/") in PROFILE_CACHE_PATHS]
+
+    shutil.rmtree(dst, ignore_errors=True)
+    shutil.copytree(src, dst, symlinks=True, ignore=ignore)
+
+
+def _remove_path(path: str):
+    if os.path.isdir(path) and not os.path.islink(path):
+        shutil.rmtree(path, ignore_errors=True)
+    elif os.path.lexists(path):
+        os.remove(path)
+
+
+def _sync_profile(src: str, dst: str):
+    # Only called on a profile no browser has open. Each piece is copied next to its target and swapped in;
+    # a directory is renamed aside first and removed after the swap, so a crash mid-sync leaves a complete copy.
+    for rel in PROFILE_SYNC_PATHS:
+        source = os.path.join(src, rel)
+        target = os.path.join(dst, rel)
+        staging, retired = f"{target}.sync", f"{target}.old"
+        _remove_path(staging)
+        if os.path.lexists(retired):
+            if os.path.lexists(target):
+                _remove_path(retired)
+            else:
+                os.replace(retired, target)
+        if not os.path.exists(source):
+            # The browser deleted it (a journal, a cleared store); a stale copy would be replayed at the next start.
+            _remove_path(target)
+            continue
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        if os.path.isdir(source):
+            shutil.copytree(source, staging)
+        else:
+            shutil.copy2(source, staging)
+        if os.path.isdir(target) and not os.path.islink(target):
+            os.replace(target, retired)
+        os.replace(staging, target)
+        _remove_path(retired)
+
+
+def _trim_profile(path: str):
+    for rel in PROFILE_CACHE_PATHS:
+        target = os.path.join(path, rel)
+        if os.path.isdir(target):
+            shutil.rmtree(target, ignore_errors=True)
+
+
+def _process_rss_mb(pids: list[int]) -> Optional[float]:
+    total = 0
+    found = False
+    for pid in pids:
+        try:
+            if psutil is not None:
+                total += psutil.Process(pid).memory_info().rss
+            else:
+                with open(f"/proc/{pid}/statm") as f:
+                    total += int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+            found = True
+        except Exception:
+            continue
+    return total / (1024 * 1024) if found else None
+
+
+class BrowserManager:
+    def __init__(self, session_id: str = "default", parent: Optional["BrowserManager"] = None, instance: int = 0, slot: int = 0, endpoint: Optional[str] = None):
+        self.session_id = session_id
+        self.parent = parent
+        self.instance = instance
+        self.slot = slot
+        self.endpoint = endpoint
+        self.cdp_port = CDP_PORT + instance + slot * BROWSER_INSTANCES
+        self.cdp_url = endpoint or f"http://127.0.0.1:{self.cdp_port}"
+        self.sessions: dict[str, "BrowserManager"] = {}
         self.playwright = None
         self.browser: Optional[Browser] = None
         self.context: Optional[BrowserContext] = None
         self.page: Optional[Page] = None
         self.user_data_dir: Optional[str] = None
         self.headless: Optional[bool] = None
-        self.download_dir: str = DEFAULT_DOWNLOAD_DIR
+        self.user_agent: Optional[str] = None
+        self.download_dir: str = _instance_path(DEFAULT_DOWNLOAD_DIR, instance)
         self.downloads: list[dict] = []
         self.last_download: Optional[dict] = None
-        self.dialog = None
-        self.dialog_future: Optional[asyncio.Future] = None
-        self.download_future: Optional[asyncio.Future] = None
+        self.dialogs: dict[Page, object] = {}
+        self.dialog_futures: dict[Page, asyncio.Future] = {}
+        self.download_futures: dict[Page, asyncio.Future] = {}
         self.network_requests = deque()
         self.network_request_map: dict[str, dict] = {}
         self.network_request_id_map: dict[int, str] = {}
         self.network_limit = 2000
-
-    async def _ensure_page(self):
+        self.recycled_pages = 0
+        self.page_titles: dict[Page, str] = {}
+        self.crashed_pages: set[Page] = set()
+        self.blocklist_pushes: dict[Page, asyncio.Task] = {}
+        self.crashes = 0
+        self.stopping = False
+        self.context_lost = False
+        self.launch_options: dict = {}
+        self.storage_snapshot: Optional[dict] = None
+        self.snapshot_task: Optional[asyncio.Task] = None
+        self.recovery_task: Optional[asyncio.Task] = None
+        self.recoveries = 0
+        self.started_at: Optional[float] = None
+        self.phase = "stopped"
+        self.startup: dict[str, int] = {}
+        self.startup_error: Optional[str] = None
+        self.started_event = asyncio.Event()
+        self.run_dir: Optional[str] = None
+        self.sync_task: Optional[asyncio.Task] = None
+        self.profile_syncs = 0
+        self.profile_sync_ms: Optional[int] = None
+        self.navigations = 0
+        self.rss_mb: Optional[float] = None
+        self.recycles = 0
+        self.recycling = False
+        self.active_requests = 0
+        self.page_ids: dict[Page, str] = {}
+        self.pages_by_id: dict[str, Page] = {}
+        self.warm_pages: deque[Page] = deque()
+        self.warm_task: Optional[asyncio.Task] = None
+        self.warm_stats = {"hits": 0, "misses": 0}
+        self.block_resources: frozenset[str] = parent.block_resources if parent else DEFAULT_BLOCK_RESOURCES
+        self.page_block_resources: dict[Page, frozenset[str]] = {}
+        self.routed = False
+        self.blocked: dict[str, int] = {}
+        self.loaded_bytes: dict[str, list[int]] = {}
+
+    async def _ensure_page(self) -> Page:
+        if self.recovering:
+            await self.wait_recovered()
         if not self.context:
             raise HTTPException(400, "Browser not started")
-        if not self.page:
-            self.page = self.context.pages[0] if self.context.pages else await self.context.new_page()
-            self._attach_page_listeners(self.page)
+        target = request_page_target.get()
+        if target is not None:
+            page = self._resolve_page(target)
+            await self._blocklist_ready(page)
+            return page
+        page = self._pinned_page()
+        if page is not None:
+            await self._blocklist_ready(page)
+            return page
+        if not self._page_alive(self.page):
+            pages = [p for p in self._user_pages() if self._page_alive(p)]
+            self.page = pages[0] if pages else await self.context.new_page()
+        await self._blocklist_ready(self.page)
+        return self.page
+
+    def _page_alive(self, page: Optional[Page]) -> bool:
+        return page is not None and page not in self.crashed_pages and not page.is_closed()
+
+    def _pinned_page(self) -> Optional[Page]:
+        # The current tab when the request's lane was chosen; /page/new may have switched tabs since.
+        page = request_current_page.get()
+        return page if page in self.page_ids and self._page_alive(page) else None
+
+    def _page_id(self, page: Page) -> str:
+        page_id = self.page_ids.get(page)
+        if page_id is None:
+            page_id = uuid.uuid4().hex[:12]
+            self.page_ids[page] = page_id
+            self.pages_by_id[page_id] = page
+            page.on("close", lambda _: self._forget_page(page))
+        return page_id
+
+    def _forget_page(self, page: Page):
+        page_id = self.page_ids.pop(page, None)
+        if page_id and self.pages_by_id.get(page_id) is page:
+            del self.pages_by_id[page_id]
+
+    def _rebind_page_id(self, old: Page, new: Page):
+        page_id = self.page_ids.pop(old, None)
+        if page_id is None:
             return
+        self.page_ids.pop(new, None)
+        self.page_ids[new] = page_id
+        self.pages_by_id[page_id] = new
+        new.on("close", lambda _: self._forget_page(new))
+
+    def _resolve_page(self, page_id: str) -> Page:
+        page = self.pages_by_id.get(page_id)
+        if page is None and page_id.isdigit():
+            # Tab index as listed by /pages, kept for older clients.
+            pages = self.context.pages
+            index = int(page_id)
+            page = pages[index] if index < len(pages) else None
+        if page is None or page.is_closed() or page in self.warm_pages:
+            raise HTTPException(404, f"Page not found: {page_id}")
+        if page in self.crashed_pages:
+            raise HTTPException(404, f"Page crashed: {page_id}")
+        return page
+
+    def lane_key(self, page_id: Optional[str] = None) -> str:
+        page = self.page
+        if page_id is not None:
+            page = self._resolve_page(page_id) if self.context else None
+        key = f"page:{self._page_id(page)}" if page is not None else f"page:{page_id or 0}"
+        return key if self.session_id == "default" else f"{self.session_id}/{key}"
+
+    def new_page_lane_key(self, request_id: str) -> str:
+        # A tab being opened has a lane of its own, so /page/new waits for no other tab.
+        key = f"page:new-{request_id}"
+        return key if self.session_id == "default" else f"{self.session_id}/{key}"
+
+    async def stop_loading(self, timeout: float = 2):
+        if not self.context:
+            return False
+
+        async def run():
+            page = await self._ensure_page()
+            session = await self.context.new_cdp_session(page)
+            try:
+                await session.send("Page.stopLoading")
+            finally:
+                await session.detach()
+
         try:
-            await self.page.title()
-        except Exception:
-            pages = list(self.context.pages)
-            if pages:
-                self.page = pages[0]
-            else:
-                self.page = await self.context.new_page()
-            self._attach_page_listeners(self.page)
+            await asyncio.wait_for(run(), timeout=timeout)
+            return True
+        except Exception as e:
+            logger.warning("Stop loading failed error=%s", e)
+            return False
+
+    async def recycle_page(self, page_id: Optional[str] = None):
+        if not self.context:
+            return {"success": False, "message": "Browser not started"}
+        old = self._resolve_page(page_id) if page_id is not None else self._pinned_page() or self.page
+        if old is None:
+            return {"success": False, "message": "No page to recycle"}
+        page = await self._replace_page(old)
+        return {"success": True, "url": page.url}
+
+    async def _replace_page(self, old: Page) -> Page:
+        url = old.url
+        page = await self.context.new_page()
+        await self._blocklist_ready(page)
+        self._rebind_page_id(old, page)
+        if old is self.page:
+            self.page = page
+        try:
+            await asyncio.wait_for(old.close(run_before_unload=False), timeout=5)
+        except Exception as e:
+            logger.warning("Close unhealthy page failed url=%s error=%s", url, e)
+        if url and url != "about:blank":
+            try:
+                await page.goto(url, wait_until="domcontentloaded", timeout=30000)
+            except Exception as e:
+                logger.warning("Reload recycled page failed url=%s error=%s", url, e)
+        self.recycled_pages += 1
+        logger.warning("Page recycled url=%s", url)
+        return page
 
     async def _retry_if_context_destroyed(self, func):
         try:
@@ -221,12 +1587,11 @@ class BrowserManager:
                 await self._ensure_page()
                 await asyncio.sleep(0.2)
                 return await func()
-            if "Target page, context or browser has been closed" in message:
-                await self.stop()
-                raise HTTPException(400, "Browser not started")
+            if BROWSER_CLOSED_MESSAGE in message:
+                raise await self._closed_error()
             raise
 
-    async def _handle_download(self, download):
+    async def _handle_download(self, page: Page, download):
         info = None
         try:
             os.makedirs(self.download_dir, exist_ok=True)
@@ -237,11 +1602,336 @@ class BrowserManager:
             info = {"url": download.url, "path": None, "filename": download.suggested_filename, "error": str(e)}
         self.last_download = info
         self.downloads.append(info)
-        if self.download_future and not self.download_future.done():
-            self.download_future.set_result(info)
+        future = self.download_futures.get(page)
+        if future and not future.done():
+            future.set_result(info)
+
+    def _user_pages(self) -> list[Page]:
+        return [p for p in self.context.pages if p not in self.warm_pages] if self.context else []
+
+    def _refill_warm_pages(self):
+        # Blank tabs would show up in the user's own browser, so attached browsers are never pre-warmed.
+        if PAGE_POOL_SIZE <= 0 or not self.context or (self.parent or self).endpoint or (self.warm_task and not self.warm_task.done()):
+            return
+        self.warm_task = asyncio.create_task(self._fill_warm_pages())
+
+    async def _fill_warm_pages(self):
+        context = self.context
+        while context is not None and context is self.context and len(self.warm_pages) < PAGE_POOL_SIZE:
+            try:
+                self.warm_pages.append(await context.new_page())
+            except Exception as e:
+                logger.warning("Warm page creation failed session=%s error=%s", self.session_id, e)
+                return
+
+    async def _take_warm_page(self) -> Optional[Page]:
+        while self.warm_pages:
+            page = self.warm_pages.popleft()
+            if not page.is_closed():
+                self.warm_stats["hits"] += 1
+                return page
+        self.warm_stats["misses"] += 1
+        return None
 
     def _attach_page_listeners(self, page: Page):
-        page.on("download", lambda download: asyncio.create_task(self._handle_download(download)))
+        if page in self.page_titles:
+            return
+        self.page_titles[page] = ""
+        self._page_id(page)
+        page.on("download", lambda download: _spawn(self._handle_download(page, download)))
+        page.on("domcontentloaded", lambda _: _spawn(self._refresh_title(page)))
+        page.on("crash", lambda _: self._on_page_crash(page))
+        page.on("framenavigated", lambda frame: self._on_navigated(page, frame))
+        page.on("close", lambda _: self._on_page_close(page))
+        if BLOCKLIST.mode == "cdp":
+            self.blocklist_pushes[page] = _spawn(self._push_blocklist(page))
+
+    async def _blocklist_ready(self, page: Page):
+        # Tabs are handed out only once their rules are in place, so the first navigation is filtered too.
+        self._attach_page_listeners(page)
+        push = self.blocklist_pushes.get(page)
+        if push is not None and not push.done():
+            await asyncio.shield(push)
+
+    async def _push_blocklist(self, page: Page):
+        # Short lists are matched inside Chrome, so blocked requests never reach Python. Child targets
+        # (out-of-process iframes, workers) are auto-attached paused and resumed once they have the list too.
+        try:
+            session = await self.context.new_cdp_session(page)
+            await BLOCKLIST.push(session)
+            session.on("Target.attachedToTarget", lambda event: _spawn(self._push_blocklist_child(session, event)))
+            await session.send("Target.setAutoAttach", {"autoAttach": True, "waitForDebuggerOnStart": True, "flatten": False})
+        except Exception as e:
+            logger.debug("Push blocklist failed session=%s url=%s error=%s", self.session_id, page.url, e)
+
+    async def _push_blocklist_child(self, session, event: dict):
+        child = event.get("sessionId")
+        try:
+            for message in BLOCKLIST.child_messages():
+                await session.send("Target.sendMessageToTarget", {"sessionId": child, "message": message})
+        except Exception as e:
+            logger.debug("Push blocklist to child target failed session=%s type=%s error=%s", self.session_id, (event.get("targetInfo") or {}).get("type"), e)
+        finally:
+            if event.get("waitingForDebugger"):
+                try:
+                    await session.send("Target.sendMessageToTarget", {"sessionId": child, "message": json.dumps({"id": 3, "method": "Runtime.runIfWaitingForDebugger"})})
+                except Exception:
+                    pass
+
+    def _on_request_failed(self, request):
+        if "ERR_BLOCKED_BY_CLIENT" in (request.failure or ""):
+            rule = BLOCKLIST.match_url(request.url)
+            if rule:
+                BLOCKLIST.record(rule)
+
+    async def _refresh_title(self, page: Page):
+        try:
+            title = await page.title()
+        except Exception:
+            return
+        if page in self.page_titles:
+            self.page_titles[page] = title
+
+    def _on_page_crash(self, page: Page):
+        self.crashed_pages.add(page)
+        self.crashes += 1
+        logger.warning("Page crashed session=%s page=%s url=%s", self.session_id, self.page_ids.get(page), page.url)
+        if AUTO_RECOVER and self.context and not self.stopping:
+            _spawn(self._recover_page(page))
+
+    async def _recover_page(self, page: Page):
+        # Swapping the tab under a running request would break it, so recovery queues for the session like a recycle.
+        request_id = uuid.uuid4().hex
+        try:
+            await scheduler.acquire(request_id, "session", None, session_id=self.session_id, priority=0, tenant="watchdog", endpoint="watchdog/recover", admit=False)
+            if self.context and not self.stopping and not page.is_closed():
+                await self._replace_page(page)
+        except Exception as e:
+            logger.warning("Crashed page recovery failed session=%s url=%s error=%s", self.session_id, page.url, e)
+        finally:
+            scheduler.release(request_id)
+
+    def _on_page_close(self, page: Page):
+        self.page_titles.pop(page, None)
+        self.blocklist_pushes.pop(page, None)
+        self.page_block_resources.pop(page, None)
+        self.crashed_pages.discard(page)
+        self.dialogs.pop(page, None)
+        if page is self.page:
+            pages = [p for p in self._user_pages() if self._page_alive(p)]
+            self.page = pages[0] if pages else None
+
+    def profile_dir(self, user_data_dir: Optional[str] = None, slot: Optional[int] = None) -> str:
+        base = user_data_dir or _instance_path(DEFAULT_USER_DATA_DIR, self.instance)
+        return os.path.abspath(_slot_path(base, self.slot if slot is None else slot))
+
+    async def _save_handoff_state(self) -> bool:
+        # A recycled browser runs on a scratch profile; hand its logins back to the main profile.
+        path = os.path.join(self.profile_dir(self.launch_options.get("user_data_dir"), 0), HANDOFF_STATE_FILE)
+        try:
+            state = await self.context.storage_state()
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+                json.dump(state, f)
+            os.replace(f"{path}.tmp", path)
+            return True
+        except Exception as e:
+            logger.warning("Save handoff state failed path=%s error=%s", path, e)
+            return False
+
+    async def apply_storage_state(self, state: dict):
+        cookies = state.get("cookies") or []
+        if cookies:
+            await self.context.add_cookies(cookies)
+        origins = {entry["origin"]: {item["name"]: item["value"] for item in entry.get("localStorage", [])} for entry in state.get("origins") or [] if entry.get("origin")}
+        if not origins:
+            return
+        # Each origin is written once from a scratch tab that is served an empty document, so nothing is fetched.
+        page = await self.context.new_page()
+        try:
+            await page.route("**/*", lambda route: route.fulfill(status=200, content_type="text/html", body=""))
+            for origin, items in origins.items():
+                try:
+                    await page.goto(origin, wait_until="domcontentloaded", timeout=10000)
+                    await page.evaluate(LOCAL_STORAGE_SEED_SCRIPT, items)
+                except Exception as e:
+                    logger.warning("Seed localStorage failed session=%s origin=%s error=%s", self.session_id, origin, e)
+        finally:
+            await page.close()
+
+    def _on_navigated(self, page: Page, frame):
+        if frame is page.main_frame:
+            (self.parent or self).navigations += 1
+
+    async def memory_mb(self) -> Optional[float]:
+        try:
+            browser = await self._shared_browser()
+            session = await browser.new_browser_cdp_session()
+            info = await session.send("SystemInfo.getProcessInfo")
+            await session.detach()
+        except Exception as e:
+            logger.debug("Process info failed instance=%s error=%s", self.instance, e)
+            return None
+        return _process_rss_mb([entry["id"] for entry in info.get("processInfo", [])])
+
+    def recycle_reason(self) -> Optional[str]:
+        if RECYCLE_NAVIGATIONS > 0 and self.navigations >= RECYCLE_NAVIGATIONS:
+            return f"navigations={self.navigations}"
+        uptime_ms = (time.monotonic() - self.started_at) * 1000 if self.started_at else 0
+        if RECYCLE_MAX_UPTIME_MS > 0 and uptime_ms >= RECYCLE_MAX_UPTIME_MS:
+            return f"uptime_ms={int(uptime_ms)}"
+        if RECYCLE_MAX_RSS_MB > 0 and self.rss_mb is not None and self.rss_mb >= RECYCLE_MAX_RSS_MB:
+            return f"rss_mb={int(self.rss_mb)}"
+        return None
+
+    def _on_context_close(self):
+        if self.stopping:
+            return
+        logger.warning("Browser context closed unexpectedly session=%s", self.session_id)
+        self.context_lost = True
+        if AUTO_RECOVER:
+            self._request_recovery()
+        else:
+            _spawn(self.stop())
+
+    async def _closed_error(self) -> HTTPException:
+        if not AUTO_RECOVER:
+            await self.stop()
+            return HTTPException(400, "Browser not started")
+        if self.context_lost or self.recovering:
+            return HTTPException(503, "Browser restarting after a crash, retry shortly", headers={"Retry-After": "5"})
+        return HTTPException(409, "Page was closed during the request")
+
+    @property
+    def recovering(self) -> bool:
+        task = (self.parent or self).recovery_task
+        return task is not None and not task.done()
+
+    async def wait_recovered(self, timeout: float = RECOVERY_WAIT_SECONDS):
+        task = (self.parent or self).recovery_task
+        if task is None or task.done() or task is asyncio.current_task():
+            return
+        try:
+            await asyncio.wait_for(asyncio.shield(task), timeout)
+        except Exception:
+            pass
+
+    def _request_recovery(self) -> asyncio.Task:
+        root = self.parent or self
+        if root.recovery_task is None or root.recovery_task.done():
+            root.recovery_task = asyncio.create_task(root._recover())
+        return root.recovery_task
+
+    def _snapshot(self) -> dict:
+        return {
+            "pages": [(self.page_ids.get(p), p.url) for p in self._user_pages()],
+            "current": self.page_ids.get(self.page) if self.page else None,
+            "storage_state": self.storage_snapshot,
+            "user_agent": self.user_agent,
+            "block_resources": list(self.block_resources),
+        }
+
+    async def _restore(self, snapshot: dict):
+        self.storage_snapshot = snapshot["storage_state"]
+        pages = [self.page] if self.page else []
+
+        async def reopen(index: int, page_id: Optional[str], url: str):
+            page = pages[index] if index < len(pages) else await self.context.new_page()
+            await self._blocklist_ready(page)
+            if page_id:
+                self.pages_by_id.pop(self.page_ids.get(page), None)
+                self.page_ids[page] = page_id
+                self.pages_by_id[page_id] = page
+            if page_id and page_id == snapshot["current"]:
+                self.page = page
+            if url and url != "about:blank":
+                try:
+                    await page.goto(url, wait_until="domcontentloaded", timeout=30000)
+                except Exception as e:
+                    logger.warning("Restore page failed session=%s url=%s error=%s", self.session_id, url, e)
+
+        await asyncio.gather(*(reopen(i, page_id, url) for i, (page_id, url) in enumerate(snapshot["pages"])))
+
+    async def _catch_up(self, snapshot: dict):
+        # Brings tabs restored from an earlier snapshot up to date: only tabs opened, closed or navigated since are touched.
+        self.storage_snapshot = snapshot["storage_state"]
+        wanted = {page_id: url for page_id, url in snapshot["pages"] if page_id}
+        for page in self._user_pages():
+            if self.page_ids.get(page) not in wanted:
+                await page.close()
+
+        async def sync(page_id: str, url: str):
+            page = self.pages_by_id.get(page_id)
+            if not self._page_alive(page):
+                page = await self.context.new_page()
+                await self._blocklist_ready(page)
+                self.pages_by_id.pop(self.page_ids.get(page), None)
+                self.page_ids[page] = page_id
+                self.pages_by_id[page_id] = page
+            elif page.url == url:
+                return
+            if url and url != "about:blank":
+                try:
+                    await page.goto(url, wait_until="domcontentloaded", timeout=30000)
+                except Exception as e:
+                    logger.warning("Restore page failed session=%s url=%s error=%s", self.session_id, url, e)
+
+        await asyncio.gather(*(sync(page_id, url) for page_id, url in wanted.items()))
+        current = self.pages_by_id.get(snapshot["current"]) if snapshot["current"] else None
+        if current is not None:
+            self.page = current
+
+    async def _snapshot_loop(self):
+        while self.context:
+            await asyncio.sleep(SNAPSHOT_INTERVAL_MS / 1000)
+            for mgr in [self] + list(self.sessions.values()):
+                if not mgr.context or mgr.context_lost:
+                    continue
+                try:
+                    mgr.storage_snapshot = await mgr.context.storage_state()
+                except Exception as e:
+                    logger.debug("Storage snapshot failed session=%s error=%s", mgr.session_id, e)
+
+    async def _recover(self):
+        await asyncio.sleep(RECOVERY_SETTLE_SECONDS)
+        if self.stopping or not self.context:
+            return
+        started = time.time()
+        if self.context_lost:
+            snapshot = self._snapshot()
+            sessions = {sid: session._snapshot() for sid, session in self.sessions.items()}
+            options = dict(self.launch_options)
+            await self.stop()
+            for attempt in range(RECOVERY_ATTEMPTS):
+                try:
+                    await self.start(**options)
+                    break
+                except Exception as e:
+                    logger.error("Browser relaunch failed instance=%s attempt=%d error=%s", self.instance, attempt + 1, e)
+                    await asyncio.sleep(2 ** attempt)
+            else:
+                logger.error("Browser recovery gave up instance=%s", self.instance)
+                return
+            if snapshot["storage_state"]:
+                try:
+                    await self.context.add_cookies(snapshot["storage_state"].get("cookies", []))
+                except Exception as e:
+                    logger.warning("Restore cookies failed instance=%s error=%s", self.instance, e)
+            if not self.endpoint or len(self._user_pages()) <= 1:
+                # A reattached browser that kept running still has its tabs.
+                await self._restore(snapshot)
+        else:
+            sessions = {sid: session._snapshot() for sid, session in self.sessions.items() if session.context_lost}
+            for sid in sessions:
+                await self.sessions[sid].stop()
+        for sid, snapshot in sessions.items():
+            try:
+                await self.create_session(sid, storage_state=snapshot["storage_state"], user_agent=snapshot["user_agent"], block_resources=snapshot["block_resources"])
+                await self.sessions[sid]._restore(snapshot)
+            except Exception as e:
+                logger.error("Session restore failed session=%s error=%s", sid, e)
+        self.recoveries += 1
+        logger.warning("Browser recovered instance=%s sessions=%d elapsed_ms=%d", self.instance, len(sessions), int((time.time() - started) * 1000))
 
     def _store_network_entry(self, entry_id: str, entry: dict):
         self.network_requests.append(entry_id)
@@ -283,6 +1973,12 @@ class BrowserManager:
         self._store_network_entry(entry_id, entry)
 
     async def _handle_response(self, response):
+        # Sampled before anything is blocked too, so the first blocked requests already have an average to go by.
+        length = response.headers.get("content-length")
+        if length and length.isdigit():
+            loaded = self.loaded_bytes.setdefault(response.request.resource_type, [0, 0])
+            loaded[0] += 1
+            loaded[1] += int(length)
         request_object_id = id(response.request)
         req_id = self.network_request_id_map.get(request_object_id)
         if not req_id:
@@ -301,18 +1997,204 @@ class BrowserManager:
             except Exception:
                 entry["response_body"] = None
         self.network_request_id_map.pop(request_object_id, None)
-    async def start(self, headless: Optional[bool] = None, user_data_dir: Optional[str] = None, user_agent: Optional[str] = None, channel: Optional[str] = None):
+    def _context_options(self, user_agent: Optional[str] = None) -> dict:
+        return {
+            "viewport": {"width": 1920, "height": 1080},
+            "user_agent": user_agent or DEFAULT_USER_AGENT,
+            "locale": "zh-CN",
+            "timezone_id": "Asia/Shanghai",
+            "accept_downloads": True,
+        }
+
+    async def _setup_context(self):
+        await self.context.add_init_script(
+            "Object.defineProperty(navigator, 'webdriver', {get: () => undefined});"
+            "Object.defineProperty(navigator, 'plugins', {get: () => [1,2,3,4,5]});"
+        )
+        self.page = self.context.pages[0] if self.context.pages else await self.context.new_page()
+        os.makedirs(self.download_dir, exist_ok=True)
+        self._attach_page_listeners(self.page)
+        self.context.on("page", lambda p: self._attach_page_listeners(p))
+        self.context.on("request", lambda r: _spawn(self._handle_request(r)))
+        self.context.on("response", lambda r: _spawn(self._handle_response(r)))
+        self.context.on("close", lambda _: self._on_context_close())
+        if BLOCKLIST.mode == "cdp":
+            # In route mode the route handler counts and attributes requests itself.
+            self.context.on("request", lambda _: BLOCKLIST.seen())
+            self.context.on("requestfailed", self._on_request_failed)
+        await self._update_route()
+        self._refill_warm_pages()
+
+    async def _update_route(self):
+        # Routing disables the HTTP cache, so the handler is only installed while something needs it.
+        needed = bool(ASSET_CACHE.enabled or BLOCKLIST.mode == "route" or self.block_resources or any(self.page_block_resources.values()))
+        if needed and not self.routed:
+            await self.context.route("**/*", self._route_request)
+            self.routed = True
+        elif not needed and self.routed:
+            await self.context.unroute("**/*", self._route_request)
+            self.routed = False
+
+    async def _set_page_blocking(self, page: Page, block_resources: Optional[frozenset[str]]):
+        if block_resources is None:
+            self.page_block_resources.pop(page, None)
+        else:
+            self.page_block_resources[page] = block_resources
+        await self._update_route()
+
+    async def _route_request(self, route):
+        request = route.request
+        if BLOCKLIST.mode == "route" and BLOCKLIST.check(request.url):
+            try:
+                await route.abort("blockedbyclient")
+            except Exception as e:
+                logger.debug("Route handling failed url=%s error=%s", request.url, e)
+            return
+        try:
+            page = request.frame.page
+        except Exception:
+            page = None
+        blocked = self.page_block_resources.get(page, self.block_resources)
+        try:
+            if request.resource_type in blocked:
+                self.blocked[request.resource_type] = self.blocked.get(request.resource_type, 0) + 1
+                await route.abort("blockedbyclient")
+            elif ASSET_CACHE.enabled and request.method == "GET" and request.resource_type in ASSET_CACHE_TYPES:
+                await self._route_cached(route)
+            else:
+                await route.fallback()
+        except Exception as e:
+            logger.debug("Route handling failed url=%s error=%s", request.url, e)
+
+    async def _route_cached(self, route):
+        request = route.request
+        # request.headers leaves out Cookie, which decides whether a response may be shared.
+        headers = {name.lower(): value for name, value in (await request.all_headers()).items()}
+        cached = await ASSET_CACHE.get(request.url, headers)
+        if cached:
+            entry, body = cached
+            await route.fulfill(status=200, headers=entry["headers"], body=body)
+            return
+        try:
+            # Redirects are left to the browser so the page sees, and the cache stores, the final URL.
+            response = await route.fetch(max_redirects=0)
+            if 300 <= response.status < 400:
+                await route.fallback()
+                return
+            body = await response.body()
+        except Exception as e:
+            logger.debug("Asset fetch failed url=%s error=%s", request.url, e)
+            await route.fallback()
+            return
+        await route.fulfill(status=response.status, headers={name: value for name, value in response.headers.items() if name not in ASSET_RESPONSE_DROP_HEADERS}, body=body)
+        # The page already has its response; a failed store only costs a future miss.
+        try:
+            await ASSET_CACHE.put(request.url, headers, response.status, response.headers, body)
+        except Exception as e:
+            logger.warning("Asset cache store failed url=%s error=%s", request.url, e)
+
+    def blocked_bytes_estimate(self) -> int:
+        # Aborted requests never download, so their size is estimated from loaded resources of the same type,
+        # or from a typical size when none of that type has loaded yet.
+        total = 0
+        for resource_type, count in self.blocked.items():
+            loaded = self.loaded_bytes.get(resource_type)
+            if loaded and loaded[0]:
+                total += count * loaded[1] // loaded[0]
+            else:
+                total += count * BLOCKED_BYTES_FALLBACK.get(resource_type, 0)
+        return total
+
+    async def _shared_browser(self) -> Browser:
+        # The persistent context has no Browser handle; extra contexts are opened over CDP on the same process.
+        if self.browser is None or not self.browser.is_connected():
+            self.browser = await self.playwright.chromium.connect_over_cdp(self.cdp_url)
+        return self.browser
+
+    async def start(self, headless: Optional[bool] = None, user_data_dir: Optional[str] = None, user_agent: Optional[str] = None, channel: Optional[str] = None, block_resources: Optional[list[str]] = None):
         if self.context:
             return {"success": True, "message": "Browser already running"}
+        if self.phase == "starting":
+            await self.started_event.wait()
+            if not self.context:
+                raise HTTPException(500, f"Browser start failed: {self.startup_error}")
+            return {"success": True, "message": "Browser already running"}
 
+        if block_resources is not None:
+            self.block_resources = _block_resources(block_resources)
+        self.phase = "starting"
+        self.started_event.clear()
+        self.startup = {}
+        self.startup_error = None
+        began = time.monotonic()
+        try:
+            result = await self._launch(headless, user_data_dir, user_agent, channel)
+            if WARMUP_URL and not self.endpoint:
+                await self._warm_up()
+            self.phase = "ready"
+            return result
+        except Exception as e:
+            self.phase = "failed"
+            self.startup_error = e.detail if isinstance(e, HTTPException) else str(e)
+            if self.playwright and not self.context:
+                try:
+                    await self.playwright.stop()
+                except Exception:
+                    pass
+                self.playwright = None
+            raise
+        finally:
+            self.startup["total_ms"] = int((time.monotonic() - began) * 1000)
+            self.started_event.set()
+            logger.info("Browser startup instance=%s phase=%s timings=%s", self.instance, self.phase, self.startup)
+
+    def _mark(self, phase: str, since: float) -> float:
+        now = time.monotonic()
+        self.startup[f"{phase}_ms"] = int((now - since) * 1000)
+        return now
+
+    async def _warm_up(self):
+        began = time.monotonic()
+        try:
+            page = await self.context.new_page()
+            await page.goto(WARMUP_URL, wait_until="domcontentloaded", timeout=30000)
+            await page.close()
+        except Exception as e:
+            logger.warning("Warm-up navigation failed url=%s error=%s", WARMUP_URL, e)
+        self._mark("warmup", began)
+
+    async def ensure_started(self):
+        root = self.parent or self
+        if root.phase == "starting":
+            await root.started_event.wait()
+        elif LAZY_START and not root.context and not root.recovering:
+            # Through the pool, so a lazily started browser gets the same recycling policies as /start.
+            await browser_pool.start(instance=root.instance)
+
+    async def _launch(self, headless: Optional[bool], user_data_dir: Optional[str], user_agent: Optional[str], channel: Optional[str]):
+        began = time.monotonic()
         self.playwright = await async_playwright().start()
+        began = self._mark("playwright", began)
+        if self.endpoint:
+            return await self._attach(user_agent, began)
 
         launch_headless = DEFAULT_HEADLESS if headless is None else headless
-        launch_user_data_dir = os.path.abspath(user_data_dir or DEFAULT_USER_DATA_DIR)
+        launch_user_data_dir = self.profile_dir(user_data_dir)
         os.makedirs(launch_user_data_dir, exist_ok=True)
+        if PROFILE_MAX_MB > 0 and await asyncio.to_thread(_dir_size_mb, launch_user_data_dir) > PROFILE_MAX_MB:
+            await asyncio.to_thread(_trim_profile, launch_user_data_dir)
+        run_dir = launch_user_data_dir
+        if PROFILE_RAMDISK:
+            run_dir = _ram_profile_path(launch_user_data_dir)
+            if self.slot == 0 and os.path.isdir(run_dir):
+                # Left behind by a server that was killed before its last sync; it is newer than any handoff state.
+                await asyncio.to_thread(_sync_profile, run_dir, launch_user_data_dir)
+                _remove_path(os.path.join(launch_user_data_dir, HANDOFF_STATE_FILE))
+            await asyncio.to_thread(_copy_profile, launch_user_data_dir, run_dir)
+            began = self._mark("profile_copy", began)
 
         args = [
-            "--remote-debugging-port=9222",
+            f"--remote-debugging-port={self.cdp_port}",
             "--no-sandbox",
             "--disable-setuid-sandbox",
             "--disable-dev-shm-usage",
@@ -324,48 +2206,147 @@ class BrowserManager:
             "--disable-features=IsolateOrigins,site-per-process",
         ]
 
-        launch_user_agent = user_agent or "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/144.0.7559.110 Safari/537.36"
         launch_channel = channel or DEFAULT_CHANNEL
         launch_kwargs = {
-            "user_data_dir": launch_user_data_dir,
+            "user_data_dir": run_dir,
             "headless": launch_headless,
             "args": args,
-            "viewport": {"width": 1920, "height": 1080},
-            "user_agent": launch_user_agent,
-            "locale": "zh-CN",
-            "timezone_id": "Asia/Shanghai",
-            "accept_downloads": True,
             "downloads_path": os.path.abspath(self.download_dir),
+            **self._context_options(user_agent),
         }
         if launch_channel:
             launch_kwargs["channel"] = launch_channel
         self.context = await self.playwright.chromium.launch_persistent_context(**launch_kwargs)
-
-        await self.context.add_init_script(
-            "Object.defineProperty(navigator, 'webdriver', {get: () => undefined});"
-            "Object.defineProperty(navigator, 'plugins', {get: () => [1,2,3,4,5]});"
-        )
+        began = self._mark("launch", began)
 
         self.user_data_dir = launch_user_data_dir
+        self.run_dir = run_dir if PROFILE_RAMDISK else None
         self.headless = launch_headless
-        self.page = self.context.pages[0] if self.context.pages else await self.context.new_page()
-        os.makedirs(self.download_dir, exist_ok=True)
-        self._attach_page_listeners(self.page)
-        self.context.on("page", lambda p: self._attach_page_listeners(p))
-        self.context.on("request", lambda r: asyncio.create_task(self._handle_request(r)))
-        self.context.on("response", lambda r: asyncio.create_task(self._handle_response(r)))
-        logger.info("Browser started headless=%s user_data_dir=%s channel=%s", self.headless, self.user_data_dir, launch_channel)
-        return {"success": True, "message": "Browser started", "headless": self.headless, "user_data_dir": self.user_data_dir}
+        self.user_agent = user_agent
+        self.launch_options = {"headless": launch_headless, "user_data_dir": user_data_dir, "user_agent": user_agent, "channel": launch_channel, "block_resources": list(self.block_resources)}
+        self.started_at = time.monotonic()
+        self.navigations = 0
+        await self._setup_context()
+        self._mark("setup", began)
+        handoff_path = os.path.join(launch_user_data_dir, HANDOFF_STATE_FILE)
+        if self.slot == 0 and os.path.exists(handoff_path):
+            try:
+                with open(handoff_path, "r", encoding="utf-8") as f:
+                    await self.apply_storage_state(json.load(f))
+                os.remove(handoff_path)
+            except Exception as e:
+                logger.warning("Load handoff state failed path=%s error=%s", handoff_path, e)
+        if AUTO_RECOVER and SNAPSHOT_INTERVAL_MS > 0:
+            self.snapshot_task = asyncio.create_task(self._snapshot_loop())
+        if self.parent is None and (self.run_dir or self.slot) and PROFILE_SYNC_INTERVAL_MS > 0:
+            # A recycled browser's scratch profile is never copied back, so a kill would lose its logins without this.
+            self.sync_task = asyncio.create_task(self._profile_sync_loop())
+        logger.info("Browser started instance=%s port=%s headless=%s user_data_dir=%s run_dir=%s channel=%s", self.instance, self.cdp_port, self.headless, self.user_data_dir, run_dir, launch_channel)
+        return {"success": True, "message": "Browser started", "instance": self.instance, "headless": self.headless, "user_data_dir": self.user_data_dir}
+
+    async def _attach(self, user_agent: Optional[str], began: float):
+        try:
+            self.browser = await self.playwright.chromium.connect_over_cdp(self.endpoint)
+        except Exception as e:
+            raise HTTPException(502, f"Connect to {self.endpoint} failed: {str(e)}")
+        began = self._mark("launch", began)
+        contexts = self.browser.contexts
+        self.context = contexts[0] if contexts else await self.browser.new_context(**self._context_options(user_agent))
+        self.user_agent = user_agent
+        self.launch_options = {"user_agent": user_agent, "block_resources": list(self.block_resources)}
+        self.started_at = time.monotonic()
+        self.navigations = 0
+        await self._setup_context()
+        self._mark("setup", began)
+        if AUTO_RECOVER and SNAPSHOT_INTERVAL_MS > 0:
+            self.snapshot_task = asyncio.create_task(self._snapshot_loop())
+        logger.info("Browser attached instance=%s endpoint=%s pages=%d", self.instance, self.endpoint, len(self.context.pages))
+        return {"success": True, "message": "Browser attached", "instance": self.instance, "endpoint": self.endpoint, "pages": len(self._user_pages())}
+
+    async def _profile_sync_loop(self):
+        # Copying SQLite and LevelDB files under a running browser can tear them, so files are only
+        # copied back once the browser has closed them. Until then the logins are saved as handoff state.
+        while self.context and not self.stopping:
+            await asyncio.sleep(PROFILE_SYNC_INTERVAL_MS / 1000)
+            if self.context and not self.stopping:
+                began = time.monotonic()
+                if await self._save_handoff_state():
+                    self.profile_syncs += 1
+                    self.profile_sync_ms = int((time.monotonic() - began) * 1000)
+
+    async def _sync_profile_files(self) -> bool:
+        began = time.monotonic()
+        try:
+            await asyncio.to_thread(_sync_profile, self.run_dir, self.user_data_dir)
+        except Exception as e:
+            logger.warning("Profile sync failed instance=%s run_dir=%s error=%s", self.instance, self.run_dir, e)
+            return False
+        self.profile_syncs += 1
+        self.profile_sync_ms = int((time.monotonic() - began) * 1000)
+        logger.debug("Profile synced instance=%s elapsed_ms=%d", self.instance, self.profile_sync_ms)
+        return True
+
+    async def _release_run_dir(self):
+        # Runs after context.close(), so the files are complete.
+        if self.slot == 0 and await self._sync_profile_files():
+            _remove_path(os.path.join(self.user_data_dir, HANDOFF_STATE_FILE))
+        await asyncio.to_thread(shutil.rmtree, self.run_dir, True)
+        self.run_dir = None
+
+    async def trim_profile(self):
+        if self.endpoint:
+            raise HTTPException(400, f"Instance {self.instance} is an attached browser, its profile is not managed here")
+        path = self.user_data_dir or self.profile_dir()
+        before = await asyncio.to_thread(_dir_size_mb, path)
+        cache_cleared = False
+        if self.context and self.page:
+            # Chrome keeps its cache files open, so a running browser drops its HTTP cache itself.
+            try:
+                session = await self.context.new_cdp_session(self.page)
+                await session.send("Network.clearBrowserCache")
+                await session.detach()
+                cache_cleared = True
+            except Exception as e:
+                logger.warning("Clear browser cache failed instance=%s error=%s", self.instance, e)
+        if not self.context or self.run_dir:
+            await asyncio.to_thread(_trim_profile, path)
+        after = await asyncio.to_thread(_dir_size_mb, path)
+        logger.info("Profile trimmed instance=%s path=%s size_mb=%.1f->%.1f", self.instance, path, before, after)
+        return {"success": True, "instance": self.instance, "user_data_dir": path, "size_mb_before": round(before, 1), "size_mb_after": round(after, 1), "browser_cache_cleared": cache_cleared}
 
     async def stop(self):
-        if not self.context:
+        if not self.context or self.stopping:
             return {"success": True, "message": "Browser not running"}
 
-        try:
-            await self.context.close()
-        except Exception:
-            pass
-        if self.playwright:
+        self.stopping = True
+        if self.parent is None and self.slot and not self.recycling and not self.context_lost:
+            await self._save_handoff_state()
+        for session in list(self.sessions.values()):
+            await session.stop()
+        for task in (self.warm_task, self.snapshot_task, self.sync_task):
+            if task and not task.done():
+                task.cancel()
+        if self.recovery_task and self.recovery_task is not asyncio.current_task() and not self.recovery_task.done():
+            self.recovery_task.cancel()
+        self.warm_task = None
+        self.snapshot_task = None
+        self.sync_task = None
+        if self.endpoint and self.parent is None:
+            # An attached browser outlives the server: drop our blank tabs, keep its context.
+            for page in list(self.warm_pages):
+                try:
+                    await page.close()
+                except Exception:
+                    pass
+        else:
+            try:
+                await self.context.close()
+            except Exception:
+                pass
+        if self.run_dir and self.parent is None:
+            await self._release_run_dir()
+        self.warm_pages.clear()
+        if self.playwright and self.parent is None:
             try:
                 await self.playwright.stop()
             except Exception:
@@ -377,32 +2358,170 @@ class BrowserManager:
         self.playwright = None
         self.user_data_dir = None
         self.headless = None
-        self.dialog = None
-        self.dialog_future = None
-        self.download_future = None
+        self.user_agent = None
+        self.dialogs.clear()
+        self.dialog_futures.clear()
+        self.download_futures.clear()
         self.network_requests.clear()
         self.network_request_map.clear()
         self.network_request_id_map.clear()
+        self.page_ids.clear()
+        self.pages_by_id.clear()
+        self.page_titles.clear()
+        self.crashed_pages.clear()
+        self.page_block_resources.clear()
+        self.routed = False
+        self.context_lost = False
+        self.stopping = False
+        self.phase = "stopped"
+
+        if self.parent is not None:
+            self.parent.sessions.pop(self.session_id, None)
+            logger.info("Session closed session_id=%s", self.session_id)
+            return {"success": True, "message": "Session closed", "session_id": self.session_id}
+        if self.endpoint:
+            logger.info("Browser detached instance=%s endpoint=%s", self.instance, self.endpoint)
+            return {"success": True, "message": "Browser detached", "instance": self.instance, "endpoint": self.endpoint}
+        logger.info("Browser stopped instance=%s", self.instance)
+        return {"success": True, "message": "Browser stopped", "instance": self.instance}
+
+    async def create_session(self, session_id: str, storage_state=None, user_agent: Optional[str] = None, block_resources: Optional[list[str]] = None):
+        if not self.context:
+            raise HTTPException(400, "Browser not started. Call POST /start first.")
+        if not SESSION_ID_PATTERN.match(session_id or ""):
+            raise HTTPException(400, "Invalid session_id, use 1-64 letters, digits, '-' or '_'")
+        if session_id == self.session_id or session_id in self.sessions:
+            raise HTTPException(409, f"Session already exists: {session_id}")
+        if isinstance(storage_state, str) and not os.path.exists(storage_state):
+            raise HTTPException(400, f"Storage state file not found: {storage_state}")
+        blocking = _block_resources(block_resources)
+
+        options = self._context_options(user_agent or self.user_agent)
+        if storage_state:
+            options["storage_state"] = storage_state
+        try:
+            browser = await self._shared_browser()
+            context = await browser.new_context(**options)
+        except Exception as e:
+            raise HTTPException(500, f"Create session failed: {str(e)}")
+
+        session = BrowserManager(session_id, parent=self, instance=self.instance)
+        session.playwright = self.playwright
+        session.browser = self.browser
+        session.headless = self.headless
+        session.user_agent = user_agent or self.user_agent
+        session.download_dir = os.path.join(self.download_dir, session_id)
+        session.context = context
+        if blocking is not None:
+            session.block_resources = blocking
+        await session._setup_context()
+        self.sessions[session_id] = session
+        logger.info("Session created session_id=%s instance=%s sessions=%d", session_id, self.instance, len(self.sessions))
+        return {"success": True, "session_id": session_id, "instance": self.instance, "download_dir": session.download_dir}
+
+    def page_count(self) -> int:
+        return len(self._user_pages()) + sum(session.page_count() for session in self.sessions.values())
+
+    def list_sessions(self) -> list[dict]:
+        return [
+            {
+                "session_id": session.session_id,
+                "instance": self.instance,
+                "running": session.context is not None,
+                "pages": len(session._user_pages()),
+                "url": session.page.url if session.page else None,
+                "network_requests": len(session.network_requests),
+            }
+            for session in [self] + list(self.sessions.values())
+        ]
 
-        logger.info("Browser stopped")
-        return {"success": True, "message": "Browser stopped"}
-
-    async def navigate(self, url: str, wait_until: str = "networkidle", timeout: int = 60000, extra_wait_ms: int = 3000, wait_for_selector: Optional[str] = None, wait_for_text: Optional[str] = None):
+    async def _goto(self, page: Page, url: str, wait_until: str, timeout: int, settle_quiet_ms: Optional[int] = None, settle_max_ms: Optional[int] = None) -> dict:
+        if wait_until != "settled":
+            await page.goto(url, wait_until=wait_until, timeout=timeout)
+            return {}
+        quiet_ms = SETTLE_QUIET_MS if settle_quiet_ms is None else settle_quiet_ms
+        max_ms = min(SETTLE_MAX_MS if settle_max_ms is None else settle_max_ms, timeout)
+        inflight = set()
+        last_activity = [time.monotonic()]
+
+        def started(request):
+            inflight.add(request)
+            last_activity[0] = time.monotonic()
+
+        def finished(request):
+            inflight.discard(request)
+            last_activity[0] = time.monotonic()
+
+        page.on("request", started)
+        page.on("requestfinished", finished)
+        page.on("requestfailed", finished)
+        began = time.monotonic()
+        settled = False
+        try:
+            await page.goto(url, wait_until="domcontentloaded", timeout=timeout)
+            deadline = began + max_ms / 1000
+            while True:
+                try:
+                    dom_quiet_ms = await page.evaluate(SETTLE_SCRIPT)
+                except Exception as e:
+                    # A client-side redirect replaced the document; its observer starts over.
+                    if "Execution context was destroyed" not in str(e):
+                        raise
+                    dom_quiet_ms = 0
+                now = time.monotonic()
+                network_quiet_ms = 0 if inflight else (now - last_activity[0]) * 1000
+                quiet_for = min(dom_quiet_ms, network_quiet_ms)
+                if quiet_for >= quiet_ms:
+                    settled = True
+                    break
+                if now >= deadline:
+                    break
+                await asyncio.sleep(max(min((quiet_ms - quiet_for) / 1000, deadline - now), 0.025))
+        finally:
+            page.remove_listener("request", started)
+            page.remove_listener("requestfinished", finished)
+            page.remove_listener("requestfailed", finished)
+        settle_ms = int((time.monotonic() - began) * 1000)
+        if not settled:
+            logger.info("Page did not settle url=%s settle_ms=%d inflight=%d", url, settle_ms, len(inflight))
+        return {"settled": settled, "settle_ms": settle_ms}
+
+    async def navigate(self, url: str, wait_until: str = "networkidle", timeout: int = 60000, extra_wait_ms: Optional[int] = None, wait_for_selector: Optional[str] = None, wait_for_text: Optional[str] = None, settle_quiet_ms: Optional[int] = None, settle_max_ms: Optional[int] = None, block_resources: Optional[list[str]] = None, cache: Optional[str] = None, include_text: bool = False, include_html: bool = False):
         if not self.page:
             raise HTTPException(400, "Browser not started. Call POST /start first.")
+        if _cache_mode(cache) == "only":
+            raise HTTPException(404, f"Not in page cache: {url}")
+        if extra_wait_ms is None:
+            extra_wait_ms = 0 if wait_until == "settled" else 3000
+        blocking = _block_resources(block_resources)
 
         try:
-            await self._ensure_page()
+            page = await self._ensure_page()
+            await self._set_page_blocking(page, blocking)
             logger.info("Navigate requested url=%s wait_until=%s timeout=%s", url, wait_until, timeout)
-            await self.page.goto(url, wait_until=wait_until, timeout=timeout)
+            settle = await self._goto(page, url, wait_until, timeout, settle_quiet_ms, settle_max_ms)
             if wait_for_selector:
-                await self.page.locator(wait_for_selector).wait_for(state="visible", timeout=timeout)
+                await page.locator(wait_for_selector).wait_for(state="visible", timeout=timeout)
             if wait_for_text:
-                await self.page.get_by_text(wait_for_text).wait_for(timeout=timeout)
+                await page.get_by_text(wait_for_text).wait_for(timeout=timeout)
             if extra_wait_ms > 0:
                 await asyncio.sleep(extra_wait_ms / 1000)
-            logger.info("Navigate completed url=%s title=%s", self.page.url, await self.page.title())
-            return {"success": True, "url": self.page.url, "title": await self.page.title()}
+            title = await page.title()
+            logger.info("Navigate completed url=%s title=%s", page.url, title)
+            result = {"success": True, "url": page.url, "title": title, **settle}
+            if cache or include_text or include_html:
+                text = await self._retry_if_context_destroyed(lambda: page.evaluate("() => document.body ? document.body.innerText : ''")) if cache or include_text else ""
+                html = await page.content() if cache or include_html else ""
+                if cache:
+                    PAGE_CACHE.put(request_session.get(), url, blocking, (wait_until, wait_for_selector, wait_for_text), page.url, title, text or "", html)
+                    result["cached"] = False
+                if include_html:
+                    result["html"] = html
+                    result["html_length"] = len(html)
+                if include_text:
+                    result["text"] = text or ""
+                    result["text_length"] = len(text or "")
+            return result
         except Exception as e:
             raise HTTPException(500, f"Navigation failed: {str(e)}")
 
@@ -411,8 +2530,8 @@ class BrowserManager:
             raise HTTPException(400, "Browser not started")
 
         try:
-            await self._ensure_page()
-            result = await self._retry_if_context_destroyed(lambda: self.page.evaluate(script, args))
+            page = await self._ensure_page()
+            result = await self._retry_if_context_destroyed(lambda: page.evaluate(script, args))
             return {"success": True, "result": result if result is not None else None}
         except Exception as e:
             raise HTTPException(500, f"Script execution failed: {str(e)}")
@@ -422,40 +2541,42 @@ class BrowserManager:
             raise HTTPException(400, "Browser not started")
 
         try:
-            await self._ensure_page()
+            page = await self._ensure_page()
             if selector:
-                await self.page.wait_for_selector(selector, timeout=timeout)
-                element = self.page.locator(selector).first
+                await page.wait_for_selector(selector, timeout=timeout)
+                element = page.locator(selector).first
                 text = await element.text_content()
             else:
-                text = await self._retry_if_context_destroyed(lambda: self.page.evaluate("() => document.body.innerText"))
+                text = await self._retry_if_context_destroyed(lambda: page.evaluate("() => document.body.innerText"))
             return {"success": True, "text": text or "", "length": len(text or "")}
         except Exception as e:
             raise HTTPException(500, f"Get text failed: {str(e)}")
 
-    async def get_current(self, include_html: bool = False, include_text: bool = False, selector: Optional[str] = None, timeout: int = 30000):
+    async def get_current(self, include_html: bool = False, include_text: bool = False, selector: Optional[str] = None, timeout: int = 30000, url: Optional[str] = None):
         if not self.page:
             raise HTTPException(400, "Browser not started")
+        page = await self._ensure_page()
+        if url and page.url != url:
+            raise HTTPException(404, f"Current page is not {url}: {page.url}")
 
         try:
-            await self._ensure_page()
-            title = await self.page.title()
+            title = await page.title()
             result = {
                 "success": True,
-                "url": self.page.url,
+                "url": page.url,
                 "title": title,
             }
             if include_html:
-                html = await self.page.content()
+                html = await page.content()
                 result["html"] = html
                 result["html_length"] = len(html or "")
             if include_text:
                 if selector:
-                    await self.page.wait_for_selector(selector, timeout=timeout)
-                    element = self.page.locator(selector).first
+                    await page.wait_for_selector(selector, timeout=timeout)
+                    element = page.locator(selector).first
                     text = await element.text_content()
                 else:
-                    text = await self._retry_if_context_destroyed(lambda: self.page.evaluate("() => document.body.innerText"))
+                    text = await self._retry_if_context_destroyed(lambda: page.evaluate("() => document.body.innerText"))
                 result["text"] = text or ""
                 result["text_length"] = len(text or "")
             return result
@@ -466,8 +2587,8 @@ class BrowserManager:
         if not self.page:
             raise HTTPException(400, "Browser not started")
         try:
-            await self._ensure_page()
-            locator = self.page.locator(selector)
+            page = await self._ensure_page()
+            locator = page.locator(selector)
             if text:
                 locator = locator.filter(has_text=text)
             await locator.first.wait_for(state="attached", timeout=timeout)
@@ -488,12 +2609,12 @@ class BrowserManager:
             raise HTTPException(400, "Browser not started")
 
         try:
-            await self._ensure_page()
+            page = await self._ensure_page()
             if selector:
-                element = self.page.locator(selector)
+                element = page.locator(selector)
                 buffer = await element.screenshot(timeout=timeout)
             else:
-                buffer = await self.page.screenshot(full_page=full_page, timeout=timeout)
+                buffer = await page.screenshot(full_page=full_page, timeout=timeout)
             image_b64 = base64.b64encode(buffer).decode("utf-8")
             return {"success": True, "image_base64": image_b64, "mime_type": "image/png", "size": len(buffer)}
         except Exception as e:
@@ -504,11 +2625,11 @@ class BrowserManager:
             raise HTTPException(400, "Browser not started")
 
         try:
-            await self._ensure_page()
+            page = await self._ensure_page()
             if selector:
-                await self.page.locator(selector).wait_for(state="visible", timeout=timeout)
+                await page.locator(selector).wait_for(state="visible", timeout=timeout)
             if text:
-                await self.page.get_by_text(text).wait_for(timeout=timeout)
+                await page.get_by_text(text).wait_for(timeout=timeout)
             return {"success": True, "message": "Wait condition satisfied"}
         except Exception as e:
             raise HTTPException(500, f"Wait failed: {str(e)}")
@@ -516,8 +2637,8 @@ class BrowserManager:
     async def click(self, selector: str, timeout: int = 10000, text_contains: Optional[str] = None, index: Optional[int] = None):
         if not self.page:
             raise HTTPException(400, "Browser not started")
-        await self._ensure_page()
-        locator = self.page.locator(selector)
+        page = await self._ensure_page()
+        locator = page.locator(selector)
         if text_contains:
             locator = locator.filter(has_text=text_contains)
         if index is not None:
@@ -530,8 +2651,8 @@ class BrowserManager:
     async def type(self, selector: str, text: str, timeout: int = 10000, clear_first: bool = True):
         if not self.page:
             raise HTTPException(400, "Browser not started")
-        await self._ensure_page()
-        locator = self.page.locator(selector)
+        page = await self._ensure_page()
+        locator = page.locator(selector)
         if clear_first:
             await locator.fill(text, timeout=timeout)
         else:
@@ -541,52 +2662,52 @@ class BrowserManager:
     async def fill(self, selector: str, value: str, timeout: int = 10000):
         if not self.page:
             raise HTTPException(400, "Browser not started")
-        await self._ensure_page()
-        await self.page.locator(selector).fill(value, timeout=timeout)
+        page = await self._ensure_page()
+        await page.locator(selector).fill(value, timeout=timeout)
         return {"success": True}
 
     async def press(self, key: str, modifiers: Optional[list[str]] = None, timeout: int = 10000):
         if not self.page:
             raise HTTPException(400, "Browser not started")
-        await self._ensure_page()
+        page = await self._ensure_page()
         combo = "+".join([*(modifiers or []), key])
-        await self.page.keyboard.press(combo, timeout=timeout)
+        await page.keyboard.press(combo, timeout=timeout)
         return {"success": True}
 
     async def drag(self, source: str, target: str, timeout: int = 10000):
         if not self.page:
             raise HTTPException(400, "Browser not started")
-        await self._ensure_page()
-        await self.page.drag_and_drop(source, target, timeout=timeout)
+        page = await self._ensure_page()
+        await page.drag_and_drop(source, target, timeout=timeout)
         return {"success": True}
 
     async def scroll(self, direction: str = "down", to_bottom: bool = False, amount: Optional[int] = None):
         if not self.page:
             raise HTTPException(400, "Browser not started")
-        await self._ensure_page()
+        page = await self._ensure_page()
         if to_bottom:
-            await self._retry_if_context_destroyed(lambda: self.page.evaluate("() => window.scrollTo(0, document.body.scrollHeight)"))
+            await self._retry_if_context_destroyed(lambda: page.evaluate("() => window.scrollTo(0, document.body.scrollHeight)"))
         elif amount:
             delta = amount if direction == "down" else -amount
-            await self._retry_if_context_destroyed(lambda: self.page.evaluate(f"() => window.scrollBy(0, {delta})"))
+            await self._retry_if_context_destroyed(lambda: page.evaluate(f"() => window.scrollBy(0, {delta})"))
         else:
             delta = "window.innerHeight" if direction == "down" else "-window.innerHeight"
-            await self._retry_if_context_destroyed(lambda: self.page.evaluate(f"() => window.scrollBy(0, {delta})"))
+            await self._retry_if_context_destroyed(lambda: page.evaluate(f"() => window.scrollBy(0, {delta})"))
         return {"success": True}
 
     async def click_point(self, x: float, y: float, button: str = "left", clicks: int = 1, delay: int = 0):
         if not self.page:
             raise HTTPException(400, "Browser not started")
-        await self._ensure_page()
-        await self.page.mouse.click(x, y, button=button, click_count=clicks, delay=delay)
+        page = await self._ensure_page()
+        await page.mouse.click(x, y, button=button, click_count=clicks, delay=delay)
         return {"success": True}
 
     async def element_box(self, selector: str, timeout: int = 30000):
         if not self.page:
             raise HTTPException(400, "Browser not started")
-        await self._ensure_page()
-        await self.page.wait_for_selector(selector, timeout=timeout)
-        box = await self.page.locator(selector).first.bounding_box()
+        page = await self._ensure_page()
+        await page.wait_for_selector(selector, timeout=timeout)
+        box = await page.locator(selector).first.bounding_box()
         if not box:
             raise HTTPException(404, "Element not visible")
         return {"success": True, "box": box}
@@ -594,14 +2715,14 @@ class BrowserManager:
     async def upload_files(self, selector: str, paths: list[str], timeout: int = 30000):
         if not self.page:
             raise HTTPException(400, "Browser not started")
-        await self._ensure_page()
+        page = await self._ensure_page()
         if not paths:
             raise HTTPException(400, "No files provided")
         resolved = [os.path.abspath(p) for p in paths]
         for p in resolved:
             if not os.path.exists(p):
                 raise HTTPException(400, f"File not found: {p}")
-        locator = self.page.locator(selector)
+        locator = page.locator(selector)
         await locator.set_input_files(resolved, timeout=timeout)
         return {"success": True, "count": len(resolved)}
 
@@ -619,77 +2740,87 @@ class BrowserManager:
     async def wait_download(self, timeout: int = 30000):
         if not self.context:
             raise HTTPException(400, "Browser not started")
-        loop = asyncio.get_running_loop()
-        self.download_future = loop.create_future()
+        # Tabs run requests concurrently, so each waits for downloads of its own tab.
+        page = await self._ensure_page()
+        future = self.download_futures[page] = asyncio.get_running_loop().create_future()
         wait_seconds = max(timeout, 1) / 1000
         try:
-            info = await asyncio.wait_for(self.download_future, timeout=wait_seconds)
+            info = await asyncio.wait_for(future, timeout=wait_seconds)
             return {"success": True, "download": info}
         except Exception:
             raise HTTPException(408, "Download wait timeout")
+        finally:
+            if self.download_futures.get(page) is future:
+                del self.download_futures[page]
 
     async def wait_dialog(self, timeout: int = 30000, action: Optional[str] = None, prompt_text: Optional[str] = None):
         if not self.page:
             raise HTTPException(400, "Browser not started")
-        if self.dialog_future and not self.dialog_future.done():
+        page = await self._ensure_page()
+        pending = self.dialog_futures.get(page)
+        if pending and not pending.done():
             raise HTTPException(409, "Dialog wait already in progress")
-        loop = asyncio.get_running_loop()
-        self.dialog_future = loop.create_future()
+        future = self.dialog_futures[page] = asyncio.get_running_loop().create_future()
         def handler(d):
-            if self.dialog_future and not self.dialog_future.done():
-                self.dialog = d
-                self.dialog_future.set_result(d)
-        self.page.once("dialog", handler)
+            if not future.done():
+                self.dialogs[page] = d
+                future.set_result(d)
+        page.once("dialog", handler)
         wait_seconds = max(timeout, 1) / 1000
         try:
-            dialog = await asyncio.wait_for(self.dialog_future, timeout=wait_seconds)
+            dialog = await asyncio.wait_for(future, timeout=wait_seconds)
             if action == "accept":
                 await dialog.accept(prompt_text or "")
-                self.dialog = None
+                self.dialogs.pop(page, None)
                 return {"success": True, "handled": "accept", "type": dialog.type, "message": dialog.message, "default_value": dialog.default_value}
             if action == "dismiss":
                 await dialog.dismiss()
-                self.dialog = None
+                self.dialogs.pop(page, None)
                 return {"success": True, "handled": "dismiss", "type": dialog.type, "message": dialog.message, "default_value": dialog.default_value}
             return {"success": True, "type": dialog.type, "message": dialog.message, "default_value": dialog.default_value}
         except Exception:
             raise HTTPException(408, "Dialog wait timeout")
+        finally:
+            if self.dialog_futures.get(page) is future:
+                del self.dialog_futures[page]
 
     async def dialog_accept(self, prompt_text: Optional[str] = None):
-        if not self.dialog:
+        page = await self._ensure_page()
+        dialog = self.dialogs.pop(page, None)
+        if not dialog:
             raise HTTPException(404, "No dialog available")
-        await self.dialog.accept(prompt_text or "")
-        self.dialog = None
+        await dialog.accept(prompt_text or "")
         return {"success": True}
 
     async def dialog_dismiss(self):
-        if not self.dialog:
+        page = await self._ensure_page()
+        dialog = self.dialogs.pop(page, None)
+        if not dialog:
             raise HTTPException(404, "No dialog available")
-        await self.dialog.dismiss()
-        self.dialog = None
+        await dialog.dismiss()
         return {"success": True}
 
     async def close_page(self):
-        if not self.page:
+        if not self.page or not self.context:
             raise HTTPException(400, "Browser not started")
+        target = request_page_target.get()
+        page = self._resolve_page(target) if target is not None else self.page
         try:
             context = self.context
-            if not context:
-                raise HTTPException(400, "Browser not started")
-            pages = list(context.pages)
+            pages = self._user_pages()
             if len(pages) <= 1:
-                await self.page.goto("about:blank")
+                await page.goto("about:blank")
                 logger.info("Close page requested, single page remains")
                 return {"success": True, "remaining_pages": 1}
-            await self.page.close()
-            remaining_pages = list(context.pages)
-            self.page = remaining_pages[0] if remaining_pages else await context.new_page()
+            await page.close()
+            remaining_pages = self._user_pages()
+            if page is self.page:
+                self.page = remaining_pages[0] if remaining_pages else await context.new_page()
             logger.info("Close page requested, remaining_pages=%s", len(remaining_pages))
             return {"success": True, "remaining_pages": len(remaining_pages)}
         except Exception as e:
-            if "Target page, context or browser has been closed" in str(e):
-                await self.stop()
-                raise HTTPException(400, "Browser not started")
+            if BROWSER_CLOSED_MESSAGE in str(e):
+                raise await self._closed_error()
             raise HTTPException(500, f"Close page failed: {str(e)}")
 
     async def export_storage(self, path: Optional[str] = None, include_json: bool = False):
@@ -705,13 +2836,13 @@ class BrowserManager:
     async def import_storage(self, cookies: Optional[list] = None, local_storage: Optional[dict] = None, url: Optional[str] = None, timeout: int = 30000):
         if not self.context or not self.page:
             raise HTTPException(400, "Browser not started")
-        await self._ensure_page()
+        page = await self._ensure_page()
         if cookies:
             await self.context.add_cookies(cookies)
         if local_storage:
             if url:
-                await self.page.goto(url, wait_until="domcontentloaded", timeout=timeout)
-            await self.page.evaluate(
+                await page.goto(url, wait_until="domcontentloaded", timeout=timeout)
+            await page.evaluate(
                 "(items) => { for (const [k, v] of Object.entries(items)) { localStorage.setItem(k, v); } }",
                 local_storage,
             )
@@ -720,11 +2851,11 @@ class BrowserManager:
     async def download_url(self, url: str, path: Optional[str] = None, timeout: int = 60000):
         if not self.context or not self.page:
             raise HTTPException(400, "Browser not started")
-        await self._ensure_page()
+        page = await self._ensure_page()
         wait_seconds = max(timeout, 1) / 1000
         try:
-            async with self.page.expect_download(timeout=timeout) as download_info:
-                await self.page.goto(url, wait_until="domcontentloaded", timeout=timeout)
+            async with page.expect_download(timeout=timeout) as download_info:
+                await page.goto(url, wait_until="domcontentloaded", timeout=timeout)
             download = await download_info.value
             os.makedirs(self.download_dir, exist_ok=True)
             target_path = os.path.abspath(path or os.path.join(self.download_dir, download.suggested_filename))
@@ -784,30 +2915,56 @@ class BrowserManager:
                     t = await p.title()
                 except Exception:
                     t = ""
-                pages.append({"id": idx, "url": p.url, "title": t, "current": p is self.page})
+                pages.append({"id": idx, "page_id": self._page_id(p), "url": p.url, "title": t, "current": p is self.page})
         return {"success": True, "status": status, "pages": pages, "downloads": len(self.downloads)}
 
     async def debug_snapshot(self, timeout: int = 30000):
         if not self.page:
             raise HTTPException(400, "Browser not started")
-        await self._ensure_page()
-        await self.page.wait_for_load_state("domcontentloaded", timeout=timeout)
-        html = await self.page.content()
-        text = await self._retry_if_context_destroyed(lambda: self.page.evaluate("() => document.body.innerText"))
-        return {"success": True, "url": self.page.url, "title": await self.page.title(), "html": html, "text": text or "", "timeout": timeout}
+        page = await self._ensure_page()
+        await page.wait_for_load_state("domcontentloaded", timeout=timeout)
+        html = await page.content()
+        text = await self._retry_if_context_destroyed(lambda: page.evaluate("() => document.body.innerText"))
+        return {"success": True, "url": page.url, "title": await page.title(), "html": html, "text": text or "", "timeout": timeout}
 
     async def get_status(self):
         if not self.context:
-            return {"running": False, "url": None, "title": None, "headless": None, "user_data_dir": None}
-        if self.page:
-            await self._ensure_page()
-        title = await self.page.title() if self.page else None
+            return {"running": False, "phase": self.phase, "startup": self.startup, "startup_error": self.startup_error, "instance": self.instance, "cdp_port": self.cdp_port, "url": None, "title": None, "headless": None, "user_data_dir": None, "recovering": self.recovering, "recoveries": self.recoveries}
+        page = self.page if self._page_alive(self.page) else None
         return {
             "running": True,
-            "url": self.page.url if self.page else None,
-            "title": title,
+            "phase": self.phase,
+            "startup": self.startup,
+            "instance": self.instance,
+            "cdp_port": self.cdp_port,
+            "url": page.url if page else None,
+            "title": self.page_titles.get(page) if page else None,
             "headless": self.headless,
             "user_data_dir": self.user_data_dir,
+            "recycled_pages": self.recycled_pages,
+            "sessions": len(self.sessions),
+            "pages": self.page_count(),
+            "warm_pages": len(self.warm_pages),
+            "warm_page_hits": self.warm_stats["hits"],
+            "warm_page_misses": self.warm_stats["misses"],
+            "crashed_pages": len(self.crashed_pages),
+            "page_crashes": self.crashes,
+            "recovering": self.recovering,
+            "recoveries": self.recoveries,
+            "slot": self.slot,
+            "endpoint": self.endpoint,
+            "uptime_ms": int((time.monotonic() - self.started_at) * 1000) if self.started_at else 0,
+            "navigations": self.navigations,
+            "rss_mb": int(self.rss_mb) if self.rss_mb is not None else None,
+            "recycles": self.recycles,
+            "recycling": self.recycling,
+            "run_dir": self.run_dir,
+            "profile_syncs": self.profile_syncs,
+            "profile_sync_ms": self.profile_sync_ms,
+            "block_resources": sorted(self.block_resources),
+            "blocked_requests": sum(self.blocked.values()),
+            "blocked_by_type": dict(self.blocked),
+            "blocked_bytes_estimate": self.blocked_bytes_estimate(),
         }
 
     async def list_pages(self):
@@ -816,29 +2973,32 @@ class BrowserManager:
         await self._ensure_page()
         pages = []
         for idx, p in enumerate(self.context.pages):
-            t = ""
-            try:
-                t = await p.title()
-            except Exception:
-                t = ""
-            pages.append({"id": idx, "url": p.url, "title": t, "current": p is self.page})
+            if p in self.warm_pages:
+                continue
+            pages.append({"id": idx, "page_id": self._page_id(p), "url": p.url, "title": self.page_titles.get(p, ""), "current": p is self.page, "crashed": p in self.crashed_pages})
         return {"success": True, "pages": pages}
 
-    async def new_page(self, url: Optional[str] = None, wait_until: str = "networkidle", timeout: int = 60000, extra_wait_ms: int = 3000, wait_for_selector: Optional[str] = None, wait_for_text: Optional[str] = None):
+    async def new_page(self, url: Optional[str] = None, wait_until: str = "networkidle", timeout: int = 60000, extra_wait_ms: Optional[int] = None, wait_for_selector: Optional[str] = None, wait_for_text: Optional[str] = None, settle_quiet_ms: Optional[int] = None, settle_max_ms: Optional[int] = None, block_resources: Optional[list[str]] = None):
         if not self.context:
             raise HTTPException(400, "Browser not started")
+        if extra_wait_ms is None:
+            extra_wait_ms = 0 if wait_until == "settled" else 3000
+        blocking = _block_resources(block_resources)
         try:
-            p = await self.context.new_page()
+            p = await self._take_warm_page() or await self.context.new_page()
         except Exception as e:
-            if "Target page, context or browser has been closed" in str(e):
-                await self.stop()
-                raise HTTPException(400, "Browser not started")
+            if BROWSER_CLOSED_MESSAGE in str(e):
+                raise await self._closed_error()
             raise
+        self._refill_warm_pages()
+        await self._blocklist_ready(p)
         self.page = p
         logger.info("New page requested url=%s", url)
+        settle = {}
         if url:
             try:
-                await p.goto(url, wait_until=wait_until, timeout=timeout)
+                await self._set_page_blocking(p, blocking)
+                settle = await self._goto(p, url, wait_until, timeout, settle_quiet_ms, settle_max_ms)
                 if wait_for_selector:
                     await p.locator(wait_for_selector).wait_for(state="visible", timeout=timeout)
                 if wait_for_text:
@@ -851,45 +3011,44 @@ class BrowserManager:
             title = await p.title()
         except Exception:
             title = ""
-        return {"success": True, "id": self.context.pages.index(p), "url": p.url, "title": title}
+        return {"success": True, "id": self.context.pages.index(p), "page_id": self._page_id(p), "url": p.url, "title": title, **settle}
 
-    async def switch_page(self, id: int):
+    async def switch_page(self, id: Optional[int] = None, page_id: Optional[str] = None):
         if not self.context:
             raise HTTPException(400, "Browser not started")
-        pages = self.context.pages
-        if id < 0 or id >= len(pages):
-            raise HTTPException(404, "Page not found")
-        self.page = pages[id]
-        return {"success": True, "current_id": id, "url": self.page.url, "title": await self.page.title()}
+        if page_id is None and id is None:
+            raise HTTPException(400, "id or page_id is required")
+        self.page = self._resolve_page(page_id if page_id is not None else str(id))
+        return {"success": True, "current_id": self.context.pages.index(self.page), "page_id": self._page_id(self.page), "url": self.page.url, "title": await self.page.title()}
 
     async def close_others(self):
         if not self.context or not self.page:
             raise HTTPException(400, "Browser not started")
         try:
             current = self.page
-            for p in list(self.context.pages):
+            for p in self._user_pages():
                 if p is not current:
                     try:
                         await p.close()
                     except Exception:
                         pass
-            remaining_pages = len(self.context.pages)
+            remaining_pages = len(self._user_pages())
             if remaining_pages == 0:
                 self.page = await self.context.new_page()
                 remaining_pages = 1
             logger.info("Close other pages requested, remaining_pages=%s", remaining_pages)
             return {"success": True, "remaining_pages": remaining_pages}
         except Exception as e:
-            if "Target page, context or browser has been closed" in str(e):
-                await self.stop()
-                raise HTTPException(400, "Browser not started")
+            if BROWSER_CLOSED_MESSAGE in str(e):
+                raise await self._closed_error()
             raise
 
     async def cdp_send(self, method: str, params: Optional[dict] = None, timeout: int = 30000):
         if not self.context or not self.page:
             raise HTTPException(400, "Browser not started")
         try:
-            session = await self.context.new_cdp_session(self.page)
+            page = await self._ensure_page()
+            session = await self.context.new_cdp_session(page)
             wait_seconds = max(timeout, 1) / 1000
             result = await asyncio.wait_for(session.send(method, params or {}), timeout=wait_seconds)
             await session.detach()
@@ -901,13 +3060,14 @@ class BrowserManager:
         if not self.context or not self.page:
             raise HTTPException(400, "Browser not started")
         try:
-            session = await self.context.new_cdp_session(self.page)
+            page = await self._ensure_page()
+            session = await self.context.new_cdp_session(page)
             v = await session.send("Browser.getVersion", {})
             await session.detach()
             return {"success": True, "version": v}
         except Exception:
             try:
-                with urllib.request.urlopen("http://127.0.0.1:9222/json/version", timeout=3) as resp:
+                with urllib.request.urlopen(f"http://{urllib.parse.urlparse(self.cdp_url).netloc}/json/version", timeout=3) as resp:
                     data = json.loads(resp.read().decode("utf-8"))
                     return {"success": True, "version": data}
             except Exception as e:
@@ -917,10 +3077,10 @@ class BrowserManager:
         if not self.context or not self.page:
             raise HTTPException(400, "Browser not started")
         try:
-            await self._ensure_page()
-            await self.page.wait_for_selector(selector, timeout=timeout)
+            page = await self._ensure_page()
+            await page.wait_for_selector(selector, timeout=timeout)
             async def run():
-                session = await self.context.new_cdp_session(self.page)
+                session = await self.context.new_cdp_session(page)
                 expression = f"document.querySelector({json.dumps(selector)})?.textContent || ''"
                 wait_seconds = max(timeout, 1) / 1000
                 result = await asyncio.wait_for(session.send("Runtime.evaluate", {"expression": expression, "returnByValue": True}), timeout=wait_seconds)
@@ -939,8 +3099,9 @@ class BrowserManager:
         if not self.context or not self.page:
             raise HTTPException(400, "Browser not started")
         try:
-            await self.page.wait_for_selector(selector, timeout=timeout)
-            session = await self.context.new_cdp_session(self.page)
+            page = await self._ensure_page()
+            await page.wait_for_selector(selector, timeout=timeout)
+            session = await self.context.new_cdp_session(page)
             document = await session.send("DOM.getDocument", {"depth": 1})
             node_id = await session.send("DOM.querySelector", {"nodeId": document["root"]["nodeId"], "selector": selector})
             html = await session.send("DOM.getOuterHTML", {"nodeId": node_id["nodeId"]})
@@ -954,8 +3115,9 @@ class BrowserManager:
         if not self.context or not self.page:
             raise HTTPException(400, "Browser not started")
         try:
-            await self.page.wait_for_selector(selector, timeout=timeout)
-            session = await self.context.new_cdp_session(self.page)
+            page = await self._ensure_page()
+            await page.wait_for_selector(selector, timeout=timeout)
+            session = await self.context.new_cdp_session(page)
             document = await session.send("DOM.getDocument", {"depth": 1})
             node_id = await session.send("DOM.querySelector", {"nodeId": document["root"]["nodeId"], "selector": selector})
             attrs = await session.send("DOM.getAttributes", {"nodeId": node_id["nodeId"]})
@@ -970,17 +3132,207 @@ class BrowserManager:
             raise HTTPException(500, f"CDP DOM attributes failed: {str(e)}")
 
 
-browser_mgr = BrowserManager()
+class BrowserPool:
+    def __init__(self, size: int = BROWSER_INSTANCES):
+        endpoints = [_cdp_endpoint(value) for value in CDP_ENDPOINTS.split(",") if value.strip()]
+        if endpoints:
+            self.instances = [BrowserManager("default" if i == 0 else f"default-{i}", instance=i, endpoint=endpoint) for i, endpoint in enumerate(endpoints)]
+        else:
+            self.instances = [BrowserManager("default" if i == 0 else f"default-{i}", instance=i) for i in range(size)]
+        self.recycle_task: Optional[asyncio.Task] = None
+
+    def _instance(self, instance: int) -> BrowserManager:
+        if not 0 <= instance < len(self.instances):
+            raise HTTPException(400, f"Invalid instance: {instance}")
+        return self.instances[instance]
+
+    def session(self, session_id: Optional[str] = None) -> BrowserManager:
+        session_id = session_id or "default"
+        for mgr in self.instances:
+            if session_id == mgr.session_id:
+                return mgr
+            if session_id in mgr.sessions:
+                return mgr.sessions[session_id]
+        raise HTTPException(404, f"Session not found: {session_id}")
+
+    def least_loaded(self) -> BrowserManager:
+        running = [mgr for mgr in self.instances if mgr.context]
+        if not running:
+            raise HTTPException(400, "Browser not started. Call POST /start first.")
+        return min(running, key=lambda mgr: (mgr.page_count(), len(mgr.sessions), mgr.instance))
+
+    async def start(self, instance: Optional[int] = None, user_data_dir: Optional[str] = None, **kwargs):
+        targets = [self._instance(instance)] if instance is not None else self.instances
+        results = await asyncio.gather(*(mgr.start(user_data_dir=_instance_path(user_data_dir, mgr.instance) if user_data_dir else None, **kwargs) for mgr in targets))
+        if (RECYCLE_NAVIGATIONS or RECYCLE_MAX_UPTIME_MS or RECYCLE_MAX_RSS_MB) and (self.recycle_task is None or self.recycle_task.done()):
+            self.recycle_task = asyncio.create_task(self._recycle_loop())
+        if len(self.instances) == 1:
+            return results[0]
+        return {"success": True, "message": "Browsers started", "instances": list(results)}
+
+    async def stop(self, instance: Optional[int] = None):
+        targets = [self._instance(instance)] if instance is not None else self.instances
+        if instance is None and self.recycle_task and not self.recycle_task.done():
+            self.recycle_task.cancel()
+        results = await asyncio.gather(*(mgr.stop() for mgr in targets))
+        if len(self.instances) == 1:
+            return results[0]
+        return {"success": True, "message": "Browsers stopped", "instances": list(results)}
+
+    async def create_session(self, session_id: str, storage_state=None, user_agent: Optional[str] = None, block_resources: Optional[list[str]] = None, instance: Optional[int] = None):
+        if any(session_id == mgr.session_id or session_id in mgr.sessions for mgr in self.instances):
+            raise HTTPException(409, f"Session already exists: {session_id}")
+        sessions = sum(len(mgr.sessions) for mgr in self.instances)
+        if MAX_SESSIONS > 0 and sessions >= MAX_SESSIONS:
+            raise HTTPException(429, f"Session limit reached: {MAX_SESSIONS}")
+        if instance is not None:
+            mgr = self._instance(instance)
+            await mgr.ensure_started()
+        else:
+            if not any(mgr.context for mgr in self.instances):
+                await self.instances[0].ensure_started()
+            mgr = self.least_loaded()
+        return await mgr.create_session(session_id, storage_state=storage_state, user_agent=user_agent, block_resources=block_resources)
+
+    async def close_session(self, session_id: str):
+        mgr = self.session(session_id)
+        if mgr.parent is None:
+            raise HTTPException(400, "The default session of an instance is closed with POST /stop")
+        return await mgr.stop()
+
+    async def trim_profile(self, instance: int = 0):
+        return await self._instance(instance).trim_profile()
+
+    async def list_sessions(self):
+        return {
+            "success": True,
+            "max_sessions": MAX_SESSIONS,
+            "sessions": [entry for mgr in self.instances for entry in mgr.list_sessions()],
+        }
+
+    async def _recycle_loop(self):
+        while True:
+            await asyncio.sleep(RECYCLE_CHECK_SECONDS)
+            for index, mgr in enumerate(list(self.instances)):
+                if not mgr.context or mgr.recovering or mgr.recycling or mgr.endpoint:
+                    continue
+                if RECYCLE_MAX_RSS_MB > 0:
+                    mgr.rss_mb = await mgr.memory_mb()
+                reason = mgr.recycle_reason()
+                if reason:
+                    try:
+                        await self.recycle(index, reason)
+                    except Exception as e:
+                        logger.error("Browser recycle failed instance=%s error=%s", index, e)
+
+    async def recycle(self, instance: int = 0, reason: str = "manual"):
+        old = self._instance(instance)
+        if not old.context:
+            raise HTTPException(400, "Browser not started. Call POST /start first.")
+        if old.endpoint:
+            raise HTTPException(400, f"Instance {instance} is an attached browser and cannot be recycled")
+        if old.recycling or old.recovering:
+            raise HTTPException(409, f"Instance {instance} is already being recycled or recovered")
+        old.recycling = True
+        started = time.time()
+        slot = 1 if old.slot != 1 else 2
+        new = BrowserManager(old.session_id, instance=old.instance, slot=slot)
+        new.download_dir = old.download_dir
+        request_id = uuid.uuid4().hex
+        logger.warning("Browser recycle started instance=%s reason=%s slot=%s->%s", instance, reason, old.slot, slot)
+        try:
+            await asyncio.to_thread(shutil.rmtree, new.profile_dir(old.launch_options.get("user_data_dir")), ignore_errors=True)
+            # The launch and a first copy of tabs and storage run while the old browser keeps serving.
+            await new.start(**old.launch_options)
+            await new.apply_storage_state(await old.context.storage_state())
+            await new._restore(old._snapshot())
+            for session_id, session in list(old.sessions.items()):
+                await new.create_session(session_id, storage_state=await session.context.storage_state(), user_agent=session.user_agent, block_resources=list(session.block_resources))
+                await new.sessions[session_id]._restore(session._snapshot())
+            # Only the final copy and the switch hold this instance's requests back, so nothing done on the old browser meanwhile is lost.
+            await scheduler.acquire_sessions(request_id, lambda: [old.session_id, *old.sessions], priority=0, tenant="recycle", endpoint="browser/recycle")
+            paused = time.time()
+            state = await old.context.storage_state()
+            await new.context.clear_cookies()
+            await new.apply_storage_state(state)
+            await new._catch_up({**old._snapshot(), "storage_state": state})
+            for session_id, session in list(old.sessions.items()):
+                state = await session.context.storage_state()
+                target = new.sessions.get(session_id)
+                if target is None:
+                    await new.create_session(session_id, storage_state=state, user_agent=session.user_agent, block_resources=list(session.block_resources))
+                    await new.sessions[session_id]._restore({**session._snapshot(), "storage_state": state})
+                    continue
+                await target.context.clear_cookies()
+                await target.apply_storage_state(state)
+                await target._catch_up({**session._snapshot(), "storage_state": state})
+            for session_id in [session_id for session_id in new.sessions if session_id not in old.sessions]:
+                await new.sessions[session_id].stop()
+        except BaseException:
+            # Also on cancellation, so a recycle stopped mid-switch never leaves requests held back.
+            scheduler.release_sessions(request_id)
+            old.recycling = False
+            new.recycling = True
+            await new.stop()
+            raise
+        new.recycles = old.recycles + 1
+        new.recycled_pages = old.recycled_pages
+        new.downloads = list(old.downloads)
+        new.last_download = old.last_download
+        self.instances[instance] = new
+        scheduler.release_sessions(request_id)
+        handoff_ms = int((time.time() - started) * 1000)
+        paused_ms = int((time.time() - paused) * 1000)
+        logger.warning("Browser recycle switched instance=%s handoff_ms=%d paused_ms=%d", instance, handoff_ms, paused_ms)
+        _spawn(self._retire(old, instance, reason, started))
+        return {"success": True, "instance": instance, "reason": reason, "slot": slot, "handoff_ms": handoff_ms, "paused_ms": paused_ms, "user_data_dir": new.user_data_dir}
+
+    async def _retire(self, old: BrowserManager, instance: int, reason: str, started: float):
+        deadline = time.monotonic() + RECYCLE_DRAIN_SECONDS
+        while time.monotonic() < deadline and sum(mgr.active_requests for mgr in [old] + list(old.sessions.values())) > 0:
+            await asyncio.sleep(0.2)
+        try:
+            await old.stop()
+        except Exception as e:
+            logger.error("Retired browser stop failed instance=%s error=%s", instance, e)
+        logger.warning("Browser recycle finished instance=%s reason=%s elapsed_ms=%d", instance, reason, int((time.time() - started) * 1000))
+
+    async def start_background(self):
+        try:
+            await self.start()
+        except Exception as e:
+            logger.error("Browser startup failed error=%s", e)
+
+    def readiness(self) -> tuple[bool, list[dict]]:
+        instances = [{"instance": mgr.instance, "phase": mgr.phase, "recovering": mgr.recovering, "startup_error": mgr.startup_error} for mgr in self.instances]
+        ready = all((mgr.phase == "ready" or (LAZY_START and mgr.phase == "stopped")) and not mgr.recovering for mgr in self.instances)
+        return ready, instances
+
+    async def wait_recovered(self):
+        await asyncio.gather(*(mgr.wait_recovered() for mgr in self.instances))
+
+    async def get_status(self):
+        instances = [await mgr.get_status() for mgr in self.instances]
+        return {**instances[0], "instances": instances}
+
+
+browser_pool = BrowserPool()
+scheduler = RequestScheduler()
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     logger.info("Service startup")
-    if AUTO_START:
-        await browser_mgr.start()
+    if RECYCLE_MAX_RSS_MB > 0 and psutil is None and not os.path.isdir("/proc"):
+        logger.warning("BROWSER_RECYCLE_MAX_RSS_MB is set but browser memory cannot be measured here; install psutil")
+    startup = asyncio.create_task(browser_pool.start_background()) if AUTO_START else None
     yield
     logger.info("Service shutdown")
-    await browser_mgr.stop()
+    if startup and not startup.done():
+        await asyncio.wait({startup})
+    await browser_pool.stop()
+    if ASSET_CACHE.enabled:
+        ASSET_CACHE.save()
 
 
 app = FastAPI(
@@ -990,6 +3342,8 @@ app = FastAPI(
     lifespan=lifespan,
 )
 
+app.router.route_class = CancellableRoute
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -999,6 +3353,165 @@ app.add_middleware(
 )
 
 
+def _session_mgr() -> BrowserManager:
+    return request_manager.get() or browser_pool.session(request_session.get())
+
+
+def _parse_priority(value: Optional[str]) -> int:
+    if not value:
+        return PRIORITY_CLASSES.index("normal")
+    try:
+        return PRIORITY_CLASSES.index(value.strip().lower())
+    except ValueError:
+        raise HTTPException(400, f"Invalid priority: {value}, expected one of {', '.join(PRIORITY_CLASSES)}")
+
+
+def _tenant_identity(request) -> tuple[str, str]:
+    api_key = request.headers.get("x-api-key")
+    if api_key:
+        return api_key, "key:" + hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:12]
+    host = request.client.host if request.client else "-"
+    return host, host
+
+
+def _body_page_id(body: bytes) -> Optional[str]:
+    if b'"page_id"' not in body:
+        return None
+    try:
+        data = json.loads(body)
+    except ValueError:
+        return None
+    value = data.get("page_id") if isinstance(data, dict) else None
+    return str(value) if value is not None else None
+
+
+def _request_timeout_ms(body: bytes, query_timeout: Optional[str]) -> Optional[int]:
+    value = query_timeout
+    if value is None and b'"timeout"' in body:
+        try:
+            data = json.loads(body)
+        except ValueError:
+            return None
+        value = data.get("timeout") if isinstance(data, dict) else None
+    try:
+        return int(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _parse_deadline(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return float(value) / 1000
+    except ValueError:
+        raise HTTPException(400, "Invalid X-Deadline header, expected Unix time in milliseconds")
+
+
+async def _client_gone(request):
+    # Once the body has been read, the only message left on the ASGI channel is http.disconnect,
+    # so a single blocking receive per request notices it without polling. The body is cached on
+    # the request first, so the handler still gets it whoever reads the channel.
+    try:
+        await request.body()
+        while (await request.receive())["type"] != "http.disconnect":
+            pass
+    except ClientDisconnect:
+        return
+    except Exception as e:
+        logger.debug("Disconnect watcher stopped path=%s error=%s", request.url.path, e)
+        await asyncio.Event().wait()
+
+
+async def _watch_client(task: asyncio.Future, disconnect: asyncio.Future, deadline: Optional[float], lease: Optional[float] = None) -> Optional[str]:
+    timeouts = []
+    if deadline is not None:
+        timeouts.append(max(deadline - time.time(), 0))
+    if lease is not None:
+        timeouts.append(max(lease - time.monotonic(), 0))
+    done, _ = await asyncio.wait({task, disconnect}, timeout=min(timeouts, default=None), return_when=asyncio.FIRST_COMPLETED)
+    if task in done:
+        return None
+    if disconnect in done:
+        return "disconnected"
+    if deadline is not None and time.time() >= deadline:
+        return "deadline"
+    return "watchdog"
+
+
+async def _wait_in_queue(acquire, disconnect: asyncio.Future, deadline: Optional[float]):
+    task = asyncio.ensure_future(acquire)
+    try:
+        reason = await _watch_client(task, disconnect, deadline)
+        if reason == "deadline":
+            scheduler.abandoned["deadline"] += 1
+            raise HTTPException(408, "Deadline exceeded while queued")
+        if reason == "disconnected":
+            scheduler.abandoned["disconnected"] += 1
+            raise HTTPException(499, "Client disconnected while queued")
+        return task.result()
+    finally:
+        if not task.done():
+            task.cancel()
+
+
+async def _recycle_hung_page(page_target: Optional[str]):
+    request_id = uuid.uuid4().hex
+    try:
+        await scheduler.acquire(request_id, "session", None, session_id=request_session.get(), priority=0, tenant="watchdog", endpoint="watchdog/recycle", admit=False)
+        await _session_mgr().recycle_page(page_target)
+    except Exception as e:
+        logger.warning("Page recycle failed page=%s error=%s", page_target, e)
+    finally:
+        scheduler.release(request_id)
+
+
+async def _run_supervised(request, call_next, request_id: str, disconnect: asyncio.Future, deadline: Optional[float], timeout_ms: Optional[int] = None):
+    control = RequestControl()
+    request_control.set(control)
+    started = time.time()
+    # A request asking for a longer timeout than the lease is given that timeout plus some slack.
+    lease = time.monotonic() + max(LANE_MAX_HOLD_MS, (timeout_ms or 0) + LEASE_TIMEOUT_GRACE_MS) / 1000 if LANE_MAX_HOLD_MS > 0 else None
+    task = asyncio.ensure_future(call_next(request))
+    reason = await _watch_client(task, disconnect, deadline, lease)
+    if reason:
+        control.cancel(reason)
+        stopped = await _session_mgr().stop_loading()
+        scheduler.cancelled[reason] += 1
+        logger.warning("Request cancelled request_id=%s path=%s reason=%s running_ms=%d stop_loading=%s", request_id, request.url.path, reason, int((time.time() - started) * 1000), stopped)
+        if reason == "watchdog":
+            done, _ = await asyncio.wait({task}, timeout=WATCHDOG_GRACE_SECONDS)
+            if not done:
+                # Only a tab whose handler ignores cancellation is hung; one that stopped in time is kept.
+                _spawn(_recycle_hung_page(request_page_target.get()))
+                logger.error("Handler ignored cancellation request_id=%s path=%s, releasing lane", request_id, request.url.path)
+                return JSONResponse(status_code=504, content={"detail": "Request exceeded lane lease"})
+    return await task
+
+
+async def _page_cache_response(request, path: str, session_id: str) -> Optional[JSONResponse]:
+    if path == "/navigate":
+        try:
+            req = NavigateRequest(**json.loads(await request.body()))
+            blocking = _block_resources(req.block_resources)
+        except (ValueError, TypeError, HTTPException):
+            return None
+        mode, url = req.cache, req.url
+        include_text, include_html = req.include_text, req.include_html
+        entry = PAGE_CACHE.get(session_id, url, blocking, (req.wait_until, req.wait_for_selector, req.wait_for_text)) if mode in {"prefer", "only"} else None
+    else:
+        params = request.query_params
+        mode, url = params.get("cache"), params.get("url")
+        include_text, include_html = params.get("include_text", "").lower() in {"1", "true"}, params.get("include_html", "").lower() in {"1", "true"}
+        # Entries hold the whole page text, so a selector is always read from the live tab.
+        entry = PAGE_CACHE.get(session_id, url, any_options=True) if mode in {"prefer", "only"} and url and not params.get("selector") else None
+    if entry is not None:
+        return JSONResponse(content=PAGE_CACHE.result(entry, include_text, include_html), headers={"X-Page-Cache": "hit"})
+    if mode == "only":
+        return JSONResponse(status_code=404, content={"detail": f"Not in page cache: {url}"}, headers={"X-Page-Cache": "miss"})
+    return None
+
+
 @app.middleware("http")
 async def log_requests(request, call_next):
     start = time.time()
@@ -1006,42 +3519,104 @@ async def log_requests(request, call_next):
     url = str(request.url)
     status_code = 500
     path = request.url.path
-    bypass_queue = path in {"/", "/health", "/queue/status", "/docs/raw", "/downloads", "/downloads/last", "/debug/info", "/network/requests"} or path.startswith("/network/request/")
+    bypass_queue = path in QUEUE_BYPASS_PATHS or path.startswith("/network/request/")
+    if path in BROWSER_SCOPE_PATHS:
+        scope = "browser"
+    elif path in SESSION_SCOPE_PATHS:
+        scope = "session"
+    else:
+        scope = "page"
+    read_only = path in READ_ONLY_PATHS
+    page_target = request.headers.get("x-page-id")
+    session_id = request.headers.get("x-session-id") or request.query_params.get("session_id") or "default"
     request_id = uuid.uuid4().hex
     enqueue_time = time.time()
-    if not bypass_queue:
-        async with queue_condition:
-            request_queue.append(request_id)
-            start_position = len(request_queue)
-            queue_condition.notify_all()
-        async with queue_condition:
-            while request_queue[0] != request_id:
-                await queue_condition.wait()
-    else:
-        start_position = 0
-    start_time = time.time()
-    try:
-        response = await call_next(request)
-        status_code = response.status_code
+    start_position = 0
+    lane_key = None
+    estimated_wait_ms = None
+    start_time = enqueue_time
+    manager = None
+    ran = False
+    disconnect = None
+    timeout_ms = None
+    pinned = None
+
+    def with_queue_headers(response):
         response.headers["X-Queue-Request-Id"] = request_id
         response.headers["X-Queue-Start-Position"] = str(start_position)
         response.headers["X-Queue-Wait-Ms"] = str(int((start_time - enqueue_time) * 1000))
+        if lane_key:
+            response.headers["X-Queue-Lane"] = lane_key
+        if estimated_wait_ms is not None:
+            response.headers["X-Queue-Estimated-Wait-Ms"] = str(estimated_wait_ms)
         return response
+
+    try:
+        request_session.set(session_id)
+        if path in PAGE_CACHE_PATHS:
+            cached = await _page_cache_response(request, path, session_id)
+            if cached is not None:
+                bypass_queue = True
+                status_code = cached.status_code
+                return cached
+        if not bypass_queue:
+            deadline = _parse_deadline(request.headers.get("x-deadline"))
+            priority = _parse_priority(request.headers.get("x-priority") or request.query_params.get("priority"))
+            identity, tenant = _tenant_identity(request)
+            # Reading the body up front leaves the ASGI channel to the disconnect watcher.
+            body = await request.body()
+            page_target = page_target or request.query_params.get("page_id") or _body_page_id(body)
+            timeout_ms = _request_timeout_ms(body, request.query_params.get("timeout"))
+            disconnect = asyncio.ensure_future(_client_gone(request))
+            if scope == "page":
+                # Lanes are named after tabs, which only exist once the browser runs; starting first keeps a tab on one lane.
+                await _session_mgr().ensure_started()
+
+            def resolve_lane():
+                nonlocal pinned
+                mgr = _session_mgr()
+                if path == "/page/new":
+                    return mgr.new_page_lane_key(request_id)
+                # A request for the current tab is pinned to the tab its lane is named after.
+                pinned = mgr.page if page_target is None else None
+                return mgr.lane_key(page_target)
+
+            acquire = scheduler.acquire(request_id, scope, resolve_lane, session_id=session_id, read_only=read_only, priority=priority, tenant=tenant, weight=scheduler.tenant_weight(identity, tenant), endpoint=path)
+            lane_key, start_position, estimated_wait_ms = await _wait_in_queue(acquire, disconnect, deadline)
+            request_page_target.set(page_target if scope != "browser" else None)
+            request_current_page.set(pinned)
+            if scope != "browser":
+                # Pin the request to its browser so a recycle can drain in-flight work.
+                manager = _session_mgr()
+                manager.active_requests += 1
+                request_manager.set(manager)
+                await manager.ensure_started()
+            if deadline is not None and time.time() >= deadline:
+                scheduler.abandoned["deadline"] += 1
+                raise HTTPException(408, "Deadline exceeded before execution")
+        start_time = time.time()
+        ran = True
+        if bypass_queue or path in NON_CANCELLABLE_PATHS:
+            response = await call_next(request)
+        else:
+            response = await _run_supervised(request, call_next, request_id, disconnect, deadline, timeout_ms)
+        status_code = response.status_code
+        return with_queue_headers(response)
+    except HTTPException as exc:
+        status_code = exc.status_code
+        start_time = time.time()
+        return with_queue_headers(JSONResponse(status_code=exc.status_code, content={"detail": exc.detail}, headers=exc.headers))
     except Exception as exc:
         logger.exception("HTTP %s %s %s 500 error=%s", client, request.method, url, exc)
-        response = JSONResponse(status_code=500, content={"success": False, "error": "Internal Server Error"})
-        response.headers["X-Queue-Request-Id"] = request_id
-        response.headers["X-Queue-Start-Position"] = str(start_position)
-        response.headers["X-Queue-Wait-Ms"] = str(int((start_time - enqueue_time) * 1000))
-        return response
+        return with_queue_headers(JSONResponse(status_code=500, content={"success": False, "error": "Internal Server Error"}))
     finally:
+        if disconnect is not None:
+            disconnect.cancel()
         if not bypass_queue:
-            async with queue_condition:
-                if request_queue and request_queue[0] == request_id:
-                    request_queue.popleft()
-                elif request_id in request_queue:
-                    request_queue.remove(request_id)
-                queue_condition.notify_all()
+            # Requests that never ran, abandoned or rejected after queueing, do not count against their tenant's share.
+            scheduler.release(request_id, refund=not ran)
+        if manager is not None:
+            manager.active_requests -= 1
         elapsed_ms = int((time.time() - start) * 1000)
         logger.info("HTTP %s %s %s %s %dms", client, request.method, url, status_code, elapsed_ms)
 
@@ -1052,22 +3627,58 @@ async def root():
         "service": "Browser Server",
         "version": "1.1.0",
         "status": "running",
-        "browser": await browser_mgr.get_status(),
+        "browser": await browser_pool.get_status(),
     }
 
 
 @app.get("/health")
 async def health():
-    return await browser_mgr.get_status()
+    return await browser_pool.get_status()
+
+
+@app.get("/livez")
+async def livez():
+    return {"status": "alive"}
+
+
+@app.get("/readyz")
+async def readyz():
+    ready, instances = browser_pool.readiness()
+    return JSONResponse(status_code=200 if ready else 503, content={"ready": ready, "instances": instances})
+
+
+@app.get("/blocklist")
+async def blocklist_status():
+    return {"success": True, **BLOCKLIST.status()}
+
+
+@app.get("/cache/assets")
+async def asset_cache_status():
+    return {"success": True, **ASSET_CACHE.status()}
+
+
+@app.post("/cache/assets/clear")
+async def clear_asset_cache():
+    if not ASSET_CACHE.enabled:
+        raise HTTPException(400, "Asset cache is off, set BROWSER_ASSET_CACHE_DIR")
+    await ASSET_CACHE.clear()
+    return {"success": True, **ASSET_CACHE.status()}
+
+
+@app.get("/cache/pages")
+async def page_cache_status():
+    return {"success": True, **PAGE_CACHE.status()}
+
+
+@app.post("/cache/pages/clear")
+async def clear_page_cache():
+    PAGE_CACHE.clear()
+    return {"success": True, **PAGE_CACHE.status()}
 
 
 @app.get("/queue/status")
 async def queue_status():
-    async with queue_condition:
-        current = request_queue[0] if request_queue else None
-        total = len(request_queue)
-        waiting = total - 1 if total > 0 else 0
-    return {"success": True, "current_request_id": current, "queue_length": total, "waiting": waiting}
+    return {"success": True, **scheduler.status()}
 
 
 @app.get("/docs/raw")
@@ -1083,181 +3694,209 @@ async def docs_raw():
 
 @app.post("/start")
 async def start_browser(req: StartRequest = StartRequest()):
-    return await browser_mgr.start(headless=req.headless, user_data_dir=req.user_data_dir, user_agent=req.user_agent, channel=req.channel)
+    return await browser_pool.start(instance=req.instance, headless=req.headless, user_data_dir=req.user_data_dir, user_agent=req.user_agent, channel=req.channel, block_resources=req.block_resources)
 
 
 @app.post("/stop")
-async def stop_browser():
-    return await browser_mgr.stop()
+async def stop_browser(req: StopRequest = StopRequest()):
+    return await browser_pool.stop(instance=req.instance)
+
+
+@app.post("/browser/recycle")
+async def recycle_browser(req: BrowserRecycleRequest = BrowserRecycleRequest()):
+    return await browser_pool.recycle(req.instance)
+
+
+@app.post("/profile/trim")
+async def trim_profile(req: ProfileTrimRequest = ProfileTrimRequest()):
+    return await browser_pool.trim_profile(req.instance)
+
+
+@app.post("/session/new")
+async def new_session(req: SessionNewRequest):
+    return await browser_pool.create_session(req.session_id, storage_state=req.storage_state, user_agent=req.user_agent, block_resources=req.block_resources, instance=req.instance)
+
+
+@app.post("/session/close")
+async def close_session(req: SessionCloseRequest):
+    return await browser_pool.close_session(req.session_id)
+
+
+@app.get("/sessions")
+async def list_sessions():
+    return await browser_pool.list_sessions()
 
 
 @app.post("/navigate")
 async def navigate(req: NavigateRequest):
-    return await browser_mgr.navigate(url=req.url, wait_until=req.wait_until, timeout=req.timeout, extra_wait_ms=req.extra_wait_ms, wait_for_selector=req.wait_for_selector, wait_for_text=req.wait_for_text)
+    return await _session_mgr().navigate(url=req.url, wait_until=req.wait_until, timeout=req.timeout, extra_wait_ms=req.extra_wait_ms, wait_for_selector=req.wait_for_selector, wait_for_text=req.wait_for_text, settle_quiet_ms=req.settle_quiet_ms, settle_max_ms=req.settle_max_ms, block_resources=req.block_resources, cache=req.cache, include_text=req.include_text, include_html=req.include_html)
 
 
 @app.post("/evaluate")
 async def evaluate(req: EvaluateRequest):
-    return await browser_mgr.evaluate(script=req.script, args=req.args, timeout=req.timeout)
+    return await _session_mgr().evaluate(script=req.script, args=req.args, timeout=req.timeout)
 
 
 @app.get("/text")
 async def get_text(selector: Optional[str] = Query(None), timeout: int = Query(30000)):
-    return await browser_mgr.get_text(selector, timeout)
+    return await _session_mgr().get_text(selector, timeout)
 
 @app.get("/current")
-async def get_current(include_html: bool = Query(False), include_text: bool = Query(False), selector: Optional[str] = Query(None), timeout: int = Query(30000)):
-    return await browser_mgr.get_current(include_html=include_html, include_text=include_text, selector=selector, timeout=timeout)
+async def get_current(include_html: bool = Query(False), include_text: bool = Query(False), selector: Optional[str] = Query(None), timeout: int = Query(30000), url: Optional[str] = Query(None), cache: Optional[str] = Query(None)):
+    # Cache hits are answered by the middleware; reaching here means a miss.
+    if _cache_mode(cache) == "only":
+        raise HTTPException(404, f"Not in page cache: {url}")
+    return await _session_mgr().get_current(include_html=include_html, include_text=include_text, selector=selector, timeout=timeout, url=url)
 
 @app.get("/find")
 async def find(selector: str = Query(...), text: Optional[str] = Query(None), limit: int = Query(20), timeout: int = Query(30000)):
-    return await browser_mgr.find(selector=selector, text=text, limit=limit, timeout=timeout)
+    return await _session_mgr().find(selector=selector, text=text, limit=limit, timeout=timeout)
 
 
 @app.post("/screenshot")
 async def screenshot(req: ScreenshotRequest):
-    return await browser_mgr.screenshot(full_page=req.full_page, selector=req.selector, timeout=req.timeout)
+    return await _session_mgr().screenshot(full_page=req.full_page, selector=req.selector, timeout=req.timeout)
 
 
 @app.post("/wait")
 async def wait_for(req: WaitRequest):
-    return await browser_mgr.wait_for(selector=req.selector, text=req.text, timeout=req.timeout)
+    return await _session_mgr().wait_for(selector=req.selector, text=req.text, timeout=req.timeout)
 
 
 @app.post("/click")
 async def click(req: ClickRequest):
-    return await browser_mgr.click(req.selector, req.timeout, text_contains=req.text_contains, index=req.index)
+    return await _session_mgr().click(req.selector, req.timeout, text_contains=req.text_contains, index=req.index)
 
 
 @app.post("/type")
 async def type_text(req: TypeRequest):
-    return await browser_mgr.type(selector=req.selector, text=req.text, timeout=req.timeout, clear_first=req.clear_first)
+    return await _session_mgr().type(selector=req.selector, text=req.text, timeout=req.timeout, clear_first=req.clear_first)
 
 @app.post("/fill")
 async def fill_text(req: FillRequest):
-    return await browser_mgr.fill(selector=req.selector, value=req.value, timeout=req.timeout)
+    return await _session_mgr().fill(selector=req.selector, value=req.value, timeout=req.timeout)
 
 @app.post("/press")
 async def press_key(req: PressRequest):
-    return await browser_mgr.press(key=req.key, modifiers=req.modifiers, timeout=req.timeout)
+    return await _session_mgr().press(key=req.key, modifiers=req.modifiers, timeout=req.timeout)
 
 @app.post("/drag")
 async def drag(req: DragRequest):
-    return await browser_mgr.drag(source=req.source, target=req.target, timeout=req.timeout)
+    return await _session_mgr().drag(source=req.source, target=req.target, timeout=req.timeout)
 
 
 @app.post("/scroll")
 async def scroll(req: ScrollRequest):
-    return await browser_mgr.scroll(direction=req.direction, to_bottom=req.to_bottom, amount=req.amount)
+    return await _session_mgr().scroll(direction=req.direction, to_bottom=req.to_bottom, amount=req.amount)
 
 @app.post("/click/point")
 async def click_point(req: ClickPointRequest):
-    return await browser_mgr.click_point(x=req.x, y=req.y, button=req.button, clicks=req.clicks, delay=req.delay)
+    return await _session_mgr().click_point(x=req.x, y=req.y, button=req.button, clicks=req.clicks, delay=req.delay)
 
 @app.post("/element/box")
 async def element_box(req: ElementBoxRequest):
-    return await browser_mgr.element_box(selector=req.selector, timeout=req.timeout)
+    return await _session_mgr().element_box(selector=req.selector, timeout=req.timeout)
 
 @app.post("/upload")
 async def upload(req: UploadRequest):
-    return await browser_mgr.upload_files(selector=req.selector, paths=req.paths, timeout=req.timeout)
+    return await _session_mgr().upload_files(selector=req.selector, paths=req.paths, timeout=req.timeout)
 
 @app.post("/download/dir")
 async def set_download_dir(req: DownloadDirRequest = DownloadDirRequest()):
-    return await browser_mgr.set_download_dir(path=req.path)
+    return await _session_mgr().set_download_dir(path=req.path)
 
 @app.get("/downloads")
 async def get_downloads():
-    return await browser_mgr.get_downloads()
+    return await _session_mgr().get_downloads()
 
 @app.get("/downloads/last")
 async def get_last_download():
-    return await browser_mgr.get_last_download()
+    return await _session_mgr().get_last_download()
 
 @app.post("/download/await")
 async def wait_download(req: DownloadWaitRequest = DownloadWaitRequest()):
-    return await browser_mgr.wait_download(timeout=req.timeout)
+    return await _session_mgr().wait_download(timeout=req.timeout)
 
 @app.post("/download")
 async def download(req: DownloadRequest):
-    return await browser_mgr.download_url(url=req.url, path=req.path, timeout=req.timeout)
+    return await _session_mgr().download_url(url=req.url, path=req.path, timeout=req.timeout)
 
 @app.post("/dialog/await")
 async def wait_dialog(req: DialogWaitRequest = DialogWaitRequest()):
-    return await browser_mgr.wait_dialog(timeout=req.timeout, action=req.action, prompt_text=req.prompt_text)
+    return await _session_mgr().wait_dialog(timeout=req.timeout, action=req.action, prompt_text=req.prompt_text)
 
 @app.post("/dialog/accept")
 async def dialog_accept(req: DialogActionRequest = DialogActionRequest()):
-    return await browser_mgr.dialog_accept(prompt_text=req.prompt_text)
+    return await _session_mgr().dialog_accept(prompt_text=req.prompt_text)
 
 @app.post("/dialog/dismiss")
-async def dialog_dismiss():
-    return await browser_mgr.dialog_dismiss()
+async def dialog_dismiss(req: DialogActionRequest = DialogActionRequest()):
+    return await _session_mgr().dialog_dismiss()
 
 @app.post("/page/close")
 async def close_page():
-    return await browser_mgr.close_page()
+    return await _session_mgr().close_page()
 
 @app.post("/cdp/send")
 async def cdp_send(req: CdpSendRequest):
-    return await browser_mgr.cdp_send(method=req.method, params=req.params, timeout=req.timeout)
+    return await _session_mgr().cdp_send(method=req.method, params=req.params, timeout=req.timeout)
 
 @app.get("/cdp/version")
 async def cdp_version():
-    return await browser_mgr.cdp_version()
+    return await _session_mgr().cdp_version()
 
 @app.post("/cdp/dom/text")
 async def cdp_dom_text(req: CdpDomRequest):
-    return await browser_mgr.cdp_dom_text(selector=req.selector, timeout=req.timeout)
+    return await _session_mgr().cdp_dom_text(selector=req.selector, timeout=req.timeout)
 
 @app.post("/cdp/dom/html")
 async def cdp_dom_html(req: CdpDomRequest):
-    return await browser_mgr.cdp_dom_html(selector=req.selector, timeout=req.timeout)
+    return await _session_mgr().cdp_dom_html(selector=req.selector, timeout=req.timeout)
 
 @app.post("/cdp/dom/attributes")
 async def cdp_dom_attributes(req: CdpDomRequest):
-    return await browser_mgr.cdp_dom_attributes(selector=req.selector, timeout=req.timeout)
+    return await _session_mgr().cdp_dom_attributes(selector=req.selector, timeout=req.timeout)
 
 @app.get("/pages")
 async def list_pages():
-    return await browser_mgr.list_pages()
+    return await _session_mgr().list_pages()
 
 @app.post("/page/new")
 async def new_page(req: NewPageRequest = NewPageRequest()):
-    return await browser_mgr.new_page(url=req.url, wait_until=req.wait_until, timeout=req.timeout, extra_wait_ms=req.extra_wait_ms, wait_for_selector=req.wait_for_selector, wait_for_text=req.wait_for_text)
+    return await _session_mgr().new_page(url=req.url, wait_until=req.wait_until, timeout=req.timeout, extra_wait_ms=req.extra_wait_ms, wait_for_selector=req.wait_for_selector, wait_for_text=req.wait_for_text, settle_quiet_ms=req.settle_quiet_ms, settle_max_ms=req.settle_max_ms, block_resources=req.block_resources)
 
 @app.post("/page/switch")
 async def switch_page(req: SwitchPageRequest):
-    return await browser_mgr.switch_page(id=req.id)
+    return await _session_mgr().switch_page(id=req.id, page_id=req.page_id)
 
 @app.post("/page/close_others")
 async def close_others():
-    return await browser_mgr.close_others()
+    return await _session_mgr().close_others()
 
 
 @app.post("/storage/export")
 async def export_storage(req: StorageExportRequest = StorageExportRequest()):
-    return await browser_mgr.export_storage(path=req.path, include_json=req.include_json)
+    return await _session_mgr().export_storage(path=req.path, include_json=req.include_json)
 
 @app.post("/storage/import")
 async def import_storage(req: StorageImportRequest = StorageImportRequest()):
-    return await browser_mgr.import_storage(cookies=req.cookies, local_storage=req.local_storage, url=req.url, timeout=req.timeout)
+    return await _session_mgr().import_storage(cookies=req.cookies, local_storage=req.local_storage, url=req.url, timeout=req.timeout)
 
 @app.get("/network/requests")
 async def network_requests(pattern: Optional[str] = Query(None), limit: int = Query(100), include_body: bool = Query(False)):
-    return await browser_mgr.list_network_requests(pattern=pattern, limit=limit, include_body=include_body)
+    return await _session_mgr().list_network_requests(pattern=pattern, limit=limit, include_body=include_body)
 
 @app.get("/network/request/{request_id}")
 async def network_request(request_id: str, include_body: bool = Query(False)):
-    return await browser_mgr.get_network_request(request_id=request_id, include_body=include_body)
+    return await _session_mgr().get_network_request(request_id=request_id, include_body=include_body)
 
 @app.get("/debug/info")
 async def debug_info():
-    return await browser_mgr.debug_info()
+    return await _session_mgr().debug_info()
 
 @app.get("/debug/snapshot")
 async def debug_snapshot(timeout: int = Query(30000)):
-    return await browser_mgr.debug_snapshot(timeout=timeout)
+    return await _session_mgr().debug_snapshot(timeout=timeout)
 
 
 if __name__ == "__main__":
@@ -13,6 +13,7 @@ module.exports = {
       BROWSER_PORT: "3456",
       BROWSER_USER_DATA_DIR: "D:\\Code\\browser_user\\user_data",
       BROWSER_HEADLESS: "true",
+      BROWSER_INSTANCES: "1",
       PYTHONUNBUFFERED: "1"
     },
     windowsHide: false,
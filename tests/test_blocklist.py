@@ -0,0 +1,76 @@
+import os
+import sys
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("playwright")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import browser_server
+from browser_server import DomainBlocklist
+
+
+@pytest.mark.parametrize("line,rule", [
+    ("ads.example.com", "ads.example.com"),
+    ("0.0.0.0 Tracker.Example.net", "tracker.example.net"),
+    ("127.0.0.1 ads.example.org # comment", "ads.example.org"),
+    ("||metrics.example.io^", "metrics.example.io"),
+    ("*.cdn.example.com", "cdn.example.com"),
+    (".example.co.", "example.co"),
+    ("# hosts file", None),
+    ("! adblock comment", None),
+    ("   ", None),
+])
+def test_parse_rule(line, rule):
+    assert DomainBlocklist.parse_rule(line) == rule
+
+
+@pytest.mark.parametrize("line", ["0.0.0.0 localhost", "example.com/path", "||example.com/ads^"])
+def test_parse_rule_rejects_non_hosts(line):
+    with pytest.raises(ValueError):
+        DomainBlocklist.parse_rule(line)
+
+
+def test_load_counts_skipped_lines(tmp_path):
+    path = tmp_path / "hosts"
+    path.write_text("# list\n0.0.0.0 ads.example.com\n0.0.0.0 localhost\nads.example.com\nbad/rule\n")
+    blocklist = DomainBlocklist()
+    blocklist.load(str(path))
+    assert blocklist.rules == {"ads.example.com"}
+    assert blocklist.skipped == 2
+
+
+def test_match_covers_subdomains_only():
+    blocklist = DomainBlocklist({"example.com", "ads.example.net"})
+    assert blocklist.match("example.com") == "example.com"
+    assert blocklist.match("a.b.example.com") == "example.com"
+    assert blocklist.match("ads.example.net") == "ads.example.net"
+    assert blocklist.match("example.net") is None
+    assert blocklist.match("notexample.com") is None
+    assert blocklist.match(None) is None
+
+
+def test_match_url_and_check():
+    blocklist = DomainBlocklist({"example.com"})
+    assert blocklist.match_url("https://user@cdn.EXAMPLE.com:8443/app.js?x=1") == "example.com"
+    assert blocklist.match_url("https://other.org/?next=https://example.com/") is None
+    assert blocklist.match_url("data:text/plain,example.com") is None
+    assert blocklist.check("http://example.com/") == "example.com"
+    assert blocklist.check("http://other.org/") is None
+    assert (blocklist.checks, blocklist.hits, blocklist.rule_hits) == (2, 1, {"example.com": 1})
+
+
+def test_compact_rules_drop_covered_subdomains():
+    blocklist = DomainBlocklist({"example.com", "ads.example.com", "x.y.example.com", "example.net", "ads.other.org"})
+    assert blocklist.compact_rules() == ["ads.other.org", "example.com", "example.net"]
+    assert blocklist.cdp_patterns()[:2] == ["*://ads.other.org/*", "*://*.ads.other.org/*"]
+
+
+def test_mode(monkeypatch):
+    assert DomainBlocklist().mode == "off"
+    assert DomainBlocklist({"example.com"}).mode == "cdp"
+    monkeypatch.setattr(browser_server, "BLOCKLIST_MODE", "route")
+    assert DomainBlocklist({"example.com"}).mode == "route"
+    assert DomainBlocklist({"example.com"}).status()["pushed_rules"] == 0
@@ -0,0 +1,72 @@
+import os
+import sys
+import time
+from email.utils import formatdate
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("playwright")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from browser_server import AssetCache, PageCache
+
+
+def test_page_cache_keys_on_options():
+    cache = PageCache(ttl_ms=60000, max_bytes=1024)
+    cache.put("default", "https://example.com/", ["image", "font"], (), "https://example.com/", "Example", "text", "<p>")
+    assert cache.get("default", "https://example.com/", ["font", "image"])["title"] == "Example"
+    assert cache.get("default", "https://example.com/") is None
+    assert cache.get("other", "https://example.com/", ["image", "font"]) is None
+    assert cache.get("default", "https://example.com/", any_options=True)["title"] == "Example"
+    assert (cache.hits, cache.misses) == (2, 2)
+
+
+def test_page_cache_expires_and_evicts():
+    cache = PageCache(ttl_ms=1, max_bytes=10)
+    cache.put("default", "https://a.example/", None, (), "https://a.example/", "A", "aaa", "aaa")
+    time.sleep(0.01)
+    assert cache.get("default", "https://a.example/") is None
+    assert cache.size == 0
+
+    cache = PageCache(ttl_ms=60000, max_bytes=10)
+    cache.put("default", "https://a.example/", None, (), "https://a.example/", "A", "aaa", "aaa")
+    cache.put("default", "https://b.example/", None, (), "https://b.example/", "B", "bbb", "bbb")
+    assert cache.get("default", "https://a.example/") is None
+    assert cache.get("default", "https://b.example/")["title"] == "B"
+    assert cache.evicted == 1
+    cache.put("default", "https://c.example/", None, (), "https://c.example/", "C", "c" * 11, "")
+    assert cache.get("default", "https://c.example/") is None
+
+
+def test_page_cache_result_includes_requested_content():
+    cache = PageCache(ttl_ms=60000, max_bytes=1024)
+    cache.put("default", "https://example.com/", None, (), "https://example.com/final", "Example", "text", "<p>")
+    result = cache.result(cache.get("default", "https://example.com/"), include_text=True, include_html=False)
+    assert result["url"] == "https://example.com/final" and result["cached"] is True
+    assert result["text"] == "text" and "html" not in result
+
+
+@pytest.mark.parametrize("headers,request_headers,fresh", [
+    ({"cache-control": "max-age=600"}, {}, True),
+    ({"cache-control": "public, max-age=0"}, {}, False),
+    ({"expires": formatdate(time.time() + 600, usegmt=True)}, {}, True),
+    ({"expires": formatdate(time.time() - 600, usegmt=True)}, {}, False),
+    ({"expires": "not a date"}, {}, False),
+    ({}, {}, False),
+    ({"cache-control": "no-store, max-age=600"}, {}, False),
+    ({"cache-control": "no-cache, max-age=600"}, {}, False),
+    ({"cache-control": "private, max-age=600"}, {}, False),
+    ({"cache-control": "max-age=600", "set-cookie": "id=1"}, {}, False),
+    ({"cache-control": "max-age=600", "vary": "*"}, {}, False),
+    ({"cache-control": "max-age=600"}, {"cookie": "id=1"}, False),
+    ({"cache-control": "max-age=600"}, {"authorization": "Bearer token"}, False),
+    ({"cache-control": "public, max-age=600"}, {"cookie": "id=1"}, True),
+    ({"cache-control": "s-maxage=600, max-age=600"}, {"authorization": "Bearer token"}, True),
+])
+def test_asset_freshness(headers, request_headers, fresh):
+    expires_at = AssetCache.freshness(headers, request_headers)
+    assert (expires_at is not None) == fresh
+    if fresh:
+        assert expires_at > time.time()
@@ -0,0 +1,48 @@
+import asyncio
+import json
+import os
+import sys
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("playwright")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from starlette.requests import Request
+
+from browser_server import _client_gone
+
+
+def make_request(messages: asyncio.Queue, headers: list) -> Request:
+    scope = {"type": "http", "method": "POST", "path": "/click", "headers": headers, "query_string": b""}
+    return Request(scope, messages.get)
+
+
+def test_watcher_keeps_body_for_the_endpoint():
+    # The watcher reads the body itself and caches it on the request, so the endpoint still gets it.
+    body = json.dumps({"selector": "#go"}).encode()
+
+    async def run():
+        messages = asyncio.Queue()
+        await messages.put({"type": "http.request", "body": body, "more_body": False})
+        request = make_request(messages, [(b"content-type", b"application/json")])
+        watcher = asyncio.ensure_future(_client_gone(request))
+        for _ in range(3):
+            await asyncio.sleep(0)
+        assert await asyncio.wait_for(request.body(), 1) == body
+        assert not watcher.done()
+        await messages.put({"type": "http.disconnect"})
+        await asyncio.wait_for(watcher, 1)
+
+    asyncio.run(run())
+
+
+def test_watcher_returns_on_disconnect_during_body():
+    async def run():
+        messages = asyncio.Queue()
+        await messages.put({"type": "http.disconnect"})
+        await asyncio.wait_for(_client_gone(make_request(messages, [(b"x-page-id", b"p1")])), 1)
+
+    asyncio.run(run())
@@ -0,0 +1,110 @@
+import asyncio
+import os
+import sys
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("playwright")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import HTTPException
+
+from browser_server import RequestScheduler
+
+
+def make_scheduler(**kwargs) -> RequestScheduler:
+    kwargs.setdefault("max_depth", 0)
+    kwargs.setdefault("max_wait_ms", 0)
+    return RequestScheduler(aging_ms=0, tenant_weights={}, **kwargs)
+
+
+def acquire(scheduler: RequestScheduler, request_id: str, scope: str, lane: str = "page:p1", session_id: str = "default", read_only: bool = False) -> asyncio.Task:
+    return asyncio.ensure_future(scheduler.acquire(request_id, scope, lambda: lane, session_id=session_id, read_only=read_only))
+
+
+async def settle():
+    for _ in range(10):
+        await asyncio.sleep(0)
+
+
+def test_pages_on_different_lanes_run_together():
+    async def run():
+        scheduler = make_scheduler()
+        first = acquire(scheduler, "r1", "page", "page:p1")
+        second = acquire(scheduler, "r2", "page", "page:p2")
+        await settle()
+        assert first.done() and second.done()
+        assert first.result()[0] == "page:p1"
+
+    asyncio.run(run())
+
+
+def test_same_lane_is_exclusive_unless_read_only():
+    async def run():
+        scheduler = make_scheduler()
+        first = acquire(scheduler, "r1", "page")
+        second = acquire(scheduler, "r2", "page")
+        await settle()
+        assert first.done() and not second.done()
+        scheduler.release("r1")
+        await settle()
+        assert second.done()
+        scheduler.release("r2")
+        reads = [acquire(scheduler, f"q{i}", "page", read_only=True) for i in range(2)]
+        await settle()
+        assert all(task.done() for task in reads)
+
+    asyncio.run(run())
+
+
+def test_browser_scope_waits_for_pages_and_holds_later_ones():
+    async def run():
+        scheduler = make_scheduler()
+        page = acquire(scheduler, "r1", "page")
+        await settle()
+        browser = acquire(scheduler, "b1", "browser")
+        later = acquire(scheduler, "r2", "page", "page:p2")
+        await settle()
+        assert page.done() and not browser.done() and not later.done()
+        scheduler.release("r1")
+        await settle()
+        assert browser.result()[0] == "browser" and not later.done()
+        scheduler.release("b1")
+        await settle()
+        assert later.done()
+
+    asyncio.run(run())
+
+
+def test_session_scope_holds_only_its_session():
+    async def run():
+        scheduler = make_scheduler()
+        session = acquire(scheduler, "s1", "session", session_id="a")
+        await settle()
+        assert session.result()[0] == "session:a"
+        same = acquire(scheduler, "r1", "page", "page:a1", session_id="a")
+        other = acquire(scheduler, "r2", "page", "page:b1", session_id="b")
+        await settle()
+        assert other.done() and not same.done()
+        assert scheduler.depth("page:a1", "a") == 1
+        scheduler.release("s1")
+        await settle()
+        assert same.done()
+
+    asyncio.run(run())
+
+
+def test_full_lane_is_rejected():
+    async def run():
+        scheduler = make_scheduler(max_depth=1)
+        acquire(scheduler, "r1", "page")
+        await settle()
+        with pytest.raises(HTTPException) as raised:
+            await scheduler.acquire("r2", "page", lambda: "page:p1")
+        assert raised.value.status_code == 429
+        assert scheduler.rejected == 1
+        assert await scheduler.acquire("r3", "page", lambda: "page:p2")
+
+    asyncio.run(run())
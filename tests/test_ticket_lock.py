@@ -0,0 +1,117 @@
+import asyncio
+import os
+import sys
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("playwright")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from browser_server import TicketLock
+
+
+def granted(lock: TicketLock) -> list[str]:
+    return list(lock.holders)
+
+
+def drain(lock: TicketLock) -> list[str]:
+    # Releases the holders one at a time and returns the order in which waiters were granted.
+    order = []
+    while lock.holders:
+        request_id = next(iter(lock.holders))
+        lock.release(request_id)
+        order.extend(request_id for request_id in lock.holders if request_id not in order)
+    return order
+
+
+def test_exclusive_waits_for_shared_holders():
+    async def run():
+        lock = TicketLock(aging_ms=0)
+        lock.enqueue("r1", shared=True)
+        lock.enqueue("r2", shared=True)
+        writer = lock.enqueue("w1")
+        assert granted(lock) == ["r1", "r2"]
+        lock.release("r1")
+        assert not writer.future.done()
+        lock.release("r2")
+        assert granted(lock) == ["w1"]
+
+    asyncio.run(run())
+
+
+def test_higher_priority_runs_first():
+    async def run():
+        lock = TicketLock(aging_ms=0)
+        lock.enqueue("hold")
+        lock.enqueue("batch", priority=2)
+        lock.enqueue("normal", priority=1)
+        lock.enqueue("interactive", priority=0)
+        assert drain(lock) == ["interactive", "normal", "batch"]
+
+    asyncio.run(run())
+
+
+def test_tenants_share_by_weight():
+    async def run():
+        lock = TicketLock(aging_ms=0)
+        lock.enqueue("hold")
+        for i in range(4):
+            lock.enqueue(f"a{i}", tenant="a")
+        for i in range(2):
+            lock.enqueue(f"b{i}", tenant="b", weight=2.0)
+        assert drain(lock) == ["a0", "b0", "b1", "a1", "a2", "a3"]
+
+    asyncio.run(run())
+
+
+def test_cancelled_ticket_refunds_only_later_tickets():
+    async def run():
+        lock = TicketLock(aging_ms=0)
+        lock.enqueue("hold")
+        first, _, last = (lock.enqueue(request_id, tenant="a") for request_id in ("a0", "a1", "a2"))
+        lock.release("a1")
+        assert "a1" not in lock.tickets
+        assert lock.start_tag(first) == 0.0
+        assert lock.start_tag(last) == 1.0
+        assert lock.enqueue("a3", tenant="a").tag == 2.0
+
+    asyncio.run(run())
+
+
+def test_cancel_while_waiting_wakes_next():
+    async def run():
+        lock = TicketLock(aging_ms=0)
+        lock.enqueue("hold")
+        waiter = lock.enqueue("w1")
+        lock.enqueue("w2")
+        task = asyncio.ensure_future(lock.wait(waiter))
+        await asyncio.sleep(0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert "w1" not in lock.tickets
+        lock.release("hold")
+        assert granted(lock) == ["w2"]
+        lock.release("w2")
+        assert len(lock) == 0
+
+    asyncio.run(run())
+
+
+def test_read_does_not_pass_earlier_write_of_same_tenant():
+    async def run():
+        lock = TicketLock(aging_ms=0)
+        lock.enqueue("hold", tenant="b")
+        lock.enqueue("write", tenant="a", priority=2)
+        lock.enqueue("read", shared=True, tenant="a", priority=0)
+        lock.enqueue("other", shared=True, tenant="c", priority=0)
+        lock.release("hold")
+        assert granted(lock) == ["other"]
+        lock.release("other")
+        assert granted(lock) == ["write"]
+        lock.release("write")
+        assert granted(lock) == ["read"]
+
+    asyncio.run(run())